@@ -1,7 +1,12 @@
-import yfinance as yf
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
+import bar_store
+
 
 # =========================
 # MENÚS
@@ -20,8 +25,9 @@ def menu_intervalo():
     print("4) 30 minutos")
     print("5) 1 hora")
     print("6) 1 día")
+    print("7) Todas (5m/15m/30m/1h/1d con una sola descarga)")
 
-    opcion = input("Opción [1-6] (Enter=5m): ").strip()
+    opcion = input("Opción [1-7] (Enter=5m): ").strip()
 
     if opcion == "1":
         return "1m"
@@ -35,6 +41,8 @@ def menu_intervalo():
         return "1h"
     elif opcion == "6":
         return "1d"
+    elif opcion == "7":
+        return "multi"
     else:
         print("Opción no válida. Se usará 5m.")
         return "5m"
@@ -44,8 +52,11 @@ def menu_intervalo():
 # DESCARGA Y ANÁLISIS
 # =========================
 
-def descargar_datos(ticker: str, period: str, interval: str) -> pd.DataFrame:
-    data = yf.download(ticker, period=period, interval=interval, progress=False)
+def descargar_datos(ticker: str, period: str, interval: str, columnas: list[str] | None = None) -> pd.DataFrame:
+    # Lee a través del almacén local: solo baja las velas nuevas
+    # (columnas=["Close"] -> solo lee el cierre del disco). Precios ajustados
+    # por dividendos/splits, como el yf.download por defecto de antes.
+    data = bar_store.get_bars(ticker, period, interval, columns=columnas, adjusted=True)
 
     if data is None or data.empty:
         raise ValueError(
@@ -61,7 +72,62 @@ def descargar_datos(ticker: str, period: str, interval: str) -> pd.DataFrame:
     return data
 
 
-def analizar_impulso(df: pd.DataFrame) -> dict:
+def calcular_rachas(signos) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rachas por run-length encoding vectorizado (sin bucle por vela).
+    Una racha = velas consecutivas con el mismo signo (+1 / -1);
+    las velas planas (0) cortan la racha y no cuentan.
+
+    Devuelve (longitudes_up, longitudes_down) en orden cronológico.
+    """
+    s = np.asarray(signos)
+    if len(s) == 0:
+        vacio = np.zeros(0, dtype=np.int64)
+        return vacio, vacio
+
+    # Fronteras de cada racha (0, cambios..., len) en un solo array
+    cambios = np.flatnonzero(s[1:] != s[:-1])
+    fronteras = np.empty(len(cambios) + 2, dtype=np.int32 if len(s) < 2**31 else np.int64)
+    fronteras[0], fronteras[-1] = 0, len(s)
+    np.add(cambios, 1, out=fronteras[1:-1])
+    del cambios
+
+    valores = s[fronteras[:-1]]
+    longitudes = np.diff(fronteras)
+    return longitudes[valores == 1], longitudes[valores == -1]
+
+
+def distribucion_rachas(longitudes, percentiles=(50, 75, 90, 95, 99)) -> dict:
+    """
+    Distribución de longitudes de racha:
+      hist: {longitud: cantidad de rachas}
+      percentiles: {p: longitud}
+    """
+    arr = np.asarray(longitudes)
+    if len(arr) == 0:
+        return {"rachas": 0, "hist": {}, "percentiles": {p: 0 for p in percentiles}}
+
+    conteo = np.bincount(arr)
+    largos = np.flatnonzero(conteo)
+    return {
+        "rachas": int(len(arr)),
+        "hist": {int(k): int(conteo[k]) for k in largos},
+        "percentiles": {p: float(v) for p, v in zip(percentiles, np.percentile(arr, percentiles))},
+    }
+
+
+UMBRAL_PLANO = 0.0001  # 0.01 %: por debajo la vela cuenta como plana
+
+
+def analizar_impulso(df: pd.DataFrame, detalle: bool = False, ligero: bool = False) -> dict:
+    """
+    Estadísticas de impulso sobre la columna Close.
+    detalle=True agrega las longitudes de todas las rachas y su distribución.
+    ligero=True usa analizar_close (solo el array de cierres, sin copias del frame).
+    """
+    if ligero:
+        return analizar_close(df["Close"], detalle=detalle)
+
     df = df.sort_index().copy()
 
     # 1) Calcular retorno
@@ -74,7 +140,7 @@ def analizar_impulso(df: pd.DataFrame) -> dict:
         raise ValueError("No hay suficientes datos (menos de 2 velas válidas) para calcular retornos.")
 
     # 3) Clasificar el signo del retorno
-    umbral_plano = 0.0001  # 0.01 %
+    umbral_plano = UMBRAL_PLANO
     df["signo"] = np.select(
         [df["ret"] > umbral_plano, df["ret"] < -umbral_plano],
         [1, -1],
@@ -90,41 +156,18 @@ def analizar_impulso(df: pd.DataFrame) -> dict:
     intensidad_down = df.loc[df["signo"] == -1, "ret"].mean() * 100
     intensidad_down_abs = df.loc[df["signo"] == -1, "ret"].abs().mean() * 100
 
-    # 4) Calcular rachas
-    signos = df["signo"].values
-    r_up, r_down = [], []
+    # 4) Calcular rachas (run-length encoding)
+    r_up, r_down = calcular_rachas(df["signo"].values)
 
-    if len(signos) > 0:
-        temp_len = 1
-        temp_sign = signos[0]
-
-        for s in signos[1:]:
-            if s == temp_sign and s != 0:
-                temp_len += 1
-            else:
-                if temp_sign == 1:
-                    r_up.append(temp_len)
-                elif temp_sign == -1:
-                    r_down.append(temp_len)
-                temp_len = 1
-                temp_sign = s
-
-        # cerrar última racha
-        if temp_sign == 1:
-            r_up.append(temp_len)
-        elif temp_sign == -1:
-            r_down.append(temp_len)
-
-    def stats(lista):
-        if not lista:
+    def stats(arr):
+        if len(arr) == 0:
             return (0, 0, 0)
-        arr = np.array(lista)
         return arr.mean(), arr.max(), arr.sum()
 
     avg_up, max_up, total_up = stats(r_up)
     avg_down, max_down, total_down = stats(r_down)
 
-    return {
+    resultado = {
         "velas": total,
         "pct_alc": alc / total * 100,
         "pct_baj": baj / total * 100,
@@ -140,6 +183,642 @@ def analizar_impulso(df: pd.DataFrame) -> dict:
         "pct_tiempo_down": total_down / total * 100 if total > 0 else 0,
     }
 
+    if detalle:
+        resultado.update({
+            "rachas_up": r_up,
+            "rachas_down": r_down,
+            "dist_up": distribucion_rachas(r_up),
+            "dist_down": distribucion_rachas(r_down),
+        })
+
+    return resultado
+
+
+def duracion_intervalo(interval: str) -> pd.Timedelta | None:
+    """
+    Duración de una vela de Yahoo (5m, 1h, 1d...). None para 1wk / 1mo.
+    """
+    unidades = {"m": "min", "h": "h", "d": "D"}
+    n, unidad = interval[:-1], interval[-1]
+    if n.isdigit() and unidad in unidades:
+        return pd.Timedelta(int(n), unidades[unidad])
+    return None
+
+
+def analizar_close(close, dtype=np.float64, detalle: bool = False) -> dict:
+    """
+    Modo de poca memoria: mismo resultado que analizar_impulso pero trabajando
+    solo sobre el array de cierres (Series o ndarray), sin copiar el frame ni
+    agregarle columnas. Pico de memoria ~3× la columna Close.
+
+    dtype=np.float32 reduce la memoria a la mitad, pero los retornos pierden
+    precisión (velas justo en el umbral pueden cambiar de signo): solo para
+    series muy grandes donde eso no importa.
+
+    Diferencia con analizar_impulso: solo los NaN de Close descartan velas
+    (el dropna del frame también miraba las otras columnas).
+    """
+    if isinstance(close, pd.Series):
+        if not close.index.is_monotonic_increasing:
+            close = close.sort_index()
+        close = close.to_numpy()
+    c = np.asarray(close, dtype=dtype)  # sin copia si ya es del tipo pedido
+
+    # Retorno (igual que pct_change): una sola asignación, el -1 en el mismo array
+    ret = c[1:] / c[:-1]
+    ret -= 1
+    validos = ~np.isnan(ret)
+    if not validos.all():
+        ret = ret[validos]
+    del validos
+
+    if len(ret) == 0:
+        raise ValueError("No hay suficientes datos (menos de 2 velas válidas) para calcular retornos.")
+
+    up = ret > UMBRAL_PLANO
+    down = ret < -UMBRAL_PLANO
+    signo = up.view(np.int8) - down.view(np.int8)
+
+    total = len(ret)
+    alc = int(np.count_nonzero(up))
+    baj = int(np.count_nonzero(down))
+    pla = total - alc - baj
+
+    nan = float("nan")
+    intensidad_up = ret[up].mean(dtype=np.float64) * 100 if alc else nan
+    intensidad_down = ret[down].mean(dtype=np.float64) * 100 if baj else nan
+    del up, down, ret
+
+    r_up, r_down = calcular_rachas(signo)
+    del signo
+
+    def stats(arr):
+        if len(arr) == 0:
+            return (0, 0, 0)
+        return arr.mean(), arr.max(), arr.sum()
+
+    avg_up, max_up, total_up = stats(r_up)
+    avg_down, max_down, total_down = stats(r_down)
+
+    resultado = {
+        "velas": total,
+        "pct_alc": alc / total * 100,
+        "pct_baj": baj / total * 100,
+        "pct_plan": pla / total * 100,
+        "int_up": intensidad_up,
+        "int_baj": intensidad_down,
+        "int_baj_abs": -intensidad_down,
+        "racha_up_avg": avg_up,
+        "racha_up_max": max_up,
+        "racha_down_avg": avg_down,
+        "racha_down_max": max_down,
+        "pct_tiempo_up": total_up / total * 100,
+        "pct_tiempo_down": total_down / total * 100,
+    }
+
+    if detalle:
+        resultado.update({
+            "rachas_up": r_up,
+            "rachas_down": r_down,
+            "dist_up": distribucion_rachas(r_up),
+            "dist_down": distribucion_rachas(r_down),
+        })
+
+    return resultado
+
+
+# =========================
+# MULTI-TEMPORALIDAD (una sola descarga)
+# =========================
+
+TIMEFRAMES = ("5m", "15m", "30m", "1h", "1d")
+
+
+def remuestrear(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Agrupa velas finas en velas de `interval` (OHLCV).
+    Intradía: los bloques se anclan en la hora habitual de apertura
+    (9:30 -> 9:30, 10:30..., igual que Yahoo) aunque el primer día venga
+    cortado. Diario: por fecha en la zona horaria del índice.
+    """
+    agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    agg = {col: f for col, f in agg.items() if col in df.columns}
+
+    duracion = duracion_intervalo(interval)
+    if duracion is None:
+        raise ValueError(f"Intervalo no soportado para remuestrear: {interval}")
+
+    if duracion >= pd.Timedelta(days=1):
+        out = df.resample(duracion).agg(agg)
+    else:
+        out = df.resample(duracion, origin=df.index[0].normalize() + hora_apertura(df.index)).agg(agg)
+    return out.dropna(subset=["Close"])  # bloques sin velas (noches, fines de semana)
+
+
+def hora_apertura(index: pd.DatetimeIndex) -> pd.Timedelta:
+    """
+    Hora habitual de la primera vela del día (la más frecuente), como
+    desplazamiento desde medianoche: 9:30 para acciones de EE.UU., 0:00 para cripto.
+    """
+    index = index.sort_values() if not index.is_monotonic_increasing else index
+    dia, hora = _dia_y_hora(index)
+    primera = np.empty(len(index), dtype=bool)
+    primera[:1] = True
+    primera[1:] = dia[1:] != dia[:-1]
+    return pd.Timedelta(int(pd.Series(hora[primera]).mode().iloc[0]), "ns")
+
+
+def _dia_y_hora(index: pd.DatetimeIndex) -> tuple[np.ndarray, np.ndarray]:
+    # Día (entero) y hora local en ns desde medianoche, sin crear fechas por vela
+    local = index.tz_localize(None) if index.tz is not None else index
+    ns = local.as_unit("ns").asi8
+    dia_ns = pd.Timedelta(days=1).value
+    return ns // dia_ns, ns % dia_ns
+
+
+def analisis_multitemporal(df: pd.DataFrame, base: str, timeframes=TIMEFRAMES) -> pd.DataFrame:
+    """
+    analizar_impulso en cada temporalidad a partir de las velas `base`.
+    Las temporalidades más finas que la base se omiten.
+    Devuelve una fila por temporalidad.
+    """
+    df = df.sort_index()
+    dur_base = duracion_intervalo(base)
+    filas = {}
+    for tf in timeframes:
+        dur = duracion_intervalo(tf)
+        if dur is None or dur < dur_base:
+            continue
+        velas = df if dur == dur_base else remuestrear(df, tf)
+        try:
+            filas[tf] = analizar_close(velas["Close"])
+        except ValueError:
+            continue  # muy pocas velas en esta temporalidad
+    return pd.DataFrame.from_dict(filas, orient="index")
+
+
+def analizar_multitemporal(ticker: str, period: str, timeframes=TIMEFRAMES) -> pd.DataFrame:
+    """
+    Una sola descarga en la temporalidad más fina pedida y el resto se
+    remuestrea localmente. Ojo con los límites de Yahoo para la base
+    (5m: últimos 60 días; 1m: 7 días).
+    """
+    base = min(timeframes, key=lambda tf: duracion_intervalo(tf) or pd.Timedelta.max)
+    df = descargar_datos(ticker, period, base, columnas=["Close"])
+    return analisis_multitemporal(df, base, timeframes)
+
+
+# =========================
+# PERFIL HORARIO (por tramo de la sesión)
+# =========================
+
+def perfil_horario(df: pd.DataFrame, bloque: str = "30min") -> pd.DataFrame:
+    """
+    Las métricas de analizar_impulso por tramo horario de la sesión
+    (cada `bloque` desde la apertura), agregando todos los días a la vez.
+
+    - Los retornos y las rachas no cruzan de un día a otro: el gap de
+      apertura no cuenta y cada racha se corta al cierre.
+    - Una racha se asigna al tramo donde empieza.
+    - Todo vectorizado: un groupby por tramo para las velas y otro para
+      las rachas (sin recorrer días).
+
+    Índice: hora de inicio del tramo ("09:30", "10:00"...).
+    """
+    close = df["Close"].sort_index()
+    idx = pd.DatetimeIndex(close.index)
+    c = close.to_numpy(dtype=np.float64)
+    if len(c) < 2:
+        raise ValueError("No hay suficientes datos para el perfil horario.")
+
+    dias, hora = _dia_y_hora(idx)
+    nuevo_dia = np.empty(len(c), dtype=bool)
+    nuevo_dia[0] = True
+    nuevo_dia[1:] = dias[1:] != dias[:-1]
+
+    ret = np.empty(len(c))
+    ret[0] = np.nan
+    ret[1:] = c[1:] / c[:-1] - 1
+    ret[nuevo_dia] = np.nan  # sin gap entre sesiones
+
+    # Tramo: minutos desde la apertura habitual, en bloques de `bloque`
+    apertura = hora_apertura(idx)
+    paso = pd.Timedelta(bloque)
+    desde_apertura = (hora - apertura.value) % pd.Timedelta(days=1).value  # antes de la apertura -> final del día
+    tramo = desde_apertura // paso.value
+
+    validos = ~np.isnan(ret)
+    ret, tramo, dia = ret[validos], tramo[validos], dias[validos]
+    if len(ret) == 0:
+        raise ValueError("No hay suficientes datos para el perfil horario.")
+
+    up = ret > UMBRAL_PLANO
+    down = ret < -UMBRAL_PLANO
+    signo = up.view(np.int8) - down.view(np.int8)
+
+    velas = pd.DataFrame({
+        "tramo": tramo,
+        "dia": dia,
+        "up": up,
+        "down": down,
+        "ret_up": np.where(up, ret, np.nan),
+        "ret_down": np.where(down, ret, np.nan),
+    })
+    g = velas.groupby("tramo")
+    out = pd.DataFrame({
+        "dias": g["dia"].nunique(),
+        "velas": g.size(),
+        "n_up": g["up"].sum(),
+        "n_down": g["down"].sum(),
+        "int_up": g["ret_up"].mean() * 100,
+        "int_baj": g["ret_down"].mean() * 100,
+    })
+    out["pct_alc"] = out["n_up"] / out["velas"] * 100
+    out["pct_baj"] = out["n_down"] / out["velas"] * 100
+    out["pct_plan"] = 100 - out["pct_alc"] - out["pct_baj"]
+    out["int_baj_abs"] = -out["int_baj"]
+
+    # Rachas (RLE): empieza una nueva al cambiar el signo o el día
+    inicio = np.empty(len(signo), dtype=bool)
+    inicio[0] = True
+    inicio[1:] = (signo[1:] != signo[:-1]) | (dia[1:] != dia[:-1])
+    pos = np.flatnonzero(inicio)
+    rachas = pd.DataFrame({
+        "tramo": tramo[pos],
+        "signo": signo[pos],
+        "largo": np.diff(np.append(pos, len(signo))),
+    })
+    rachas = rachas[rachas["signo"] != 0]
+    r = rachas.groupby(["tramo", "signo"])["largo"].agg(["mean", "max"]).unstack("signo")
+    for sig, nombre in ((1, "up"), (-1, "down")):
+        for stat in ("mean", "max"):
+            col = (stat, sig)
+            serie = r[col] if col in r.columns else pd.Series(dtype=float)
+            out[f"racha_{nombre}_{'avg' if stat == 'mean' else 'max'}"] = serie.reindex(out.index).fillna(0)
+
+    minutos = [int((apertura + paso * int(t)).total_seconds() // 60) % (24 * 60) for t in out.index]
+    out.index = [f"{m // 60:02d}:{m % 60:02d}" for m in minutos]
+    out.index.name = "tramo"
+    return out[[
+        "dias", "velas", "pct_alc", "pct_baj", "pct_plan",
+        "int_up", "int_baj", "int_baj_abs",
+        "racha_up_avg", "racha_up_max", "racha_down_avg", "racha_down_max",
+    ]]
+
+
+def perfiles_horarios(tickers: list[str], periods=("60d",), intervals=("5m",), bloque: str = "30min") -> pd.DataFrame:
+    """
+    perfil_horario de varios tickers (una descarga en bloque por periodo e
+    intervalo) en una sola tabla larga: ticker, period, interval, tramo, métricas.
+    Los tickers sin perfil (sin datos, o 1 vela por día con -i 1d) quedan
+    como una fila con la columna error, igual que en escanear_watchlist.
+    """
+    tickers = [t.strip().upper() for t in tickers if t.strip()]
+    partes = []
+    for period in periods:
+        for interval in intervals:
+            bars = bar_store.get_bars_many(tickers, period, interval, columns=["Close"], adjusted=True)
+            for ticker in tickers:
+                df = bars.get(ticker)
+                error = None
+                if df is None or df.empty or "Close" not in df.columns:
+                    error = "Sin datos (periodo/intervalo no disponible en Yahoo)"
+                else:
+                    try:
+                        perfil = perfil_horario(df, bloque).reset_index()
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    partes.append(pd.DataFrame([{"ticker": ticker, "period": period,
+                                                 "interval": interval, "error": error}]))
+                    continue
+                perfil.insert(0, "interval", interval)
+                perfil.insert(0, "period", period)
+                perfil.insert(0, "ticker", ticker)
+                partes.append(perfil)
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+# =========================
+# ACUMULADOR INCREMENTAL (vela a vela)
+# =========================
+
+class AcumuladorImpulso:
+    """
+    Mismas estadísticas que analizar_impulso pero actualizadas vela a vela:
+    cada cierre nuevo cuesta O(1) y no hace falta volver a bajar ni recorrer
+    toda la ventana. El estado se puede guardar/cargar en JSON.
+
+    Solo acumula (no hay ventana deslizante): para "últimos 30d" se arranca
+    con el histórico y se siguen agregando las velas nuevas.
+    """
+
+    def __init__(self):
+        self.prev_close = float("nan")
+        self.ultimo_ts = None          # timestamp (ISO) de la última vela procesada
+        self.velas = 0
+        self.alc = 0
+        self.baj = 0
+        self.pla = 0
+        self.suma_up = 0.0             # suma de retornos de velas alcistas
+        self.suma_down = 0.0           # suma de retornos de velas bajistas (negativa)
+        self.rachas_up = 0             # cantidad de rachas (incluye la abierta)
+        self.rachas_down = 0
+        self.max_up = 0
+        self.max_down = 0
+        self.signo_abierto = 0         # signo de la racha en curso (0 = ninguna)
+        self.racha_abierta = 0         # longitud de la racha en curso
+
+    # ---------- actualización ----------
+
+    def actualizar(self, close: float):
+        """
+        Agrega un cierre (en orden cronológico). O(1).
+        """
+        close = float(close)
+        prev, self.prev_close = self.prev_close, close
+        ret = close / prev - 1.0 if prev == prev and close == close else float("nan")
+        if ret != ret:
+            return  # primera vela o hueco: igual que el dropna de analizar_impulso
+
+        signo = 1 if ret > UMBRAL_PLANO else -1 if ret < -UMBRAL_PLANO else 0
+        self.velas += 1
+        if signo == 1:
+            self.alc += 1
+            self.suma_up += ret
+        elif signo == -1:
+            self.baj += 1
+            self.suma_down += ret
+        else:
+            self.pla += 1
+
+        if signo != 0 and signo == self.signo_abierto:
+            self.racha_abierta += 1
+        else:
+            self.signo_abierto, self.racha_abierta = signo, 1 if signo else 0
+            if signo == 1:
+                self.rachas_up += 1
+            elif signo == -1:
+                self.rachas_down += 1
+
+        if signo == 1:
+            self.max_up = max(self.max_up, self.racha_abierta)
+        elif signo == -1:
+            self.max_down = max(self.max_down, self.racha_abierta)
+
+    def actualizar_lote(self, closes):
+        """
+        Agrega muchos cierres de una vez (vectorizado). Equivale a llamar
+        actualizar() con cada uno; la racha abierta continúa entre lotes.
+        """
+        closes = np.asarray(closes, dtype=float)
+        if len(closes) == 0:
+            return
+
+        previos = np.concatenate(([self.prev_close], closes[:-1]))
+        self.prev_close = float(closes[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = closes / previos - 1.0
+        ret = ret[~np.isnan(ret)]
+        if len(ret) == 0:
+            return
+
+        signos = np.select([ret > UMBRAL_PLANO, ret < -UMBRAL_PLANO], [1, -1], default=0)
+        self.velas += len(ret)
+        self.alc += int((signos == 1).sum())
+        self.baj += int((signos == -1).sum())
+        self.pla += int((signos == 0).sum())
+        self.suma_up += float(ret[signos == 1].sum())
+        self.suma_down += float(ret[signos == -1].sum())
+
+        # Rachas del lote (RLE); la primera se une a la abierta si tiene su mismo signo
+        cortes = np.flatnonzero(signos[1:] != signos[:-1]) + 1
+        inicios = np.concatenate(([0], cortes))
+        longitudes = np.diff(np.concatenate((inicios, [len(signos)])))
+        valores = signos[inicios]
+        if self.signo_abierto != 0 and valores[0] == self.signo_abierto:
+            longitudes[0] += self.racha_abierta
+            if valores[0] == 1:
+                self.rachas_up -= 1
+            else:
+                self.rachas_down -= 1
+
+        up, down = longitudes[valores == 1], longitudes[valores == -1]
+        self.rachas_up += len(up)
+        self.rachas_down += len(down)
+        if len(up):
+            self.max_up = max(self.max_up, int(up.max()))
+        if len(down):
+            self.max_down = max(self.max_down, int(down.max()))
+        self.signo_abierto = int(valores[-1])
+        self.racha_abierta = int(longitudes[-1]) if valores[-1] else 0
+
+    def actualizar_df(self, df: pd.DataFrame):
+        """
+        Agrega solo las velas de `df` posteriores a la última ya procesada
+        (se puede pasar la ventana completa de bar_store en cada ciclo).
+        """
+        close = df["Close"].sort_index()
+        if self.ultimo_ts is not None:
+            close = close[close.index > pd.Timestamp(self.ultimo_ts)]
+        if close.empty:
+            return
+        self.actualizar_lote(close.to_numpy())
+        self.ultimo_ts = close.index[-1].isoformat()
+
+    # ---------- resultado ----------
+
+    def resultado(self) -> dict:
+        """
+        Mismo dict que analizar_impulso (sin detalle).
+        """
+        total = self.velas
+        if total == 0:
+            raise ValueError("No hay suficientes datos (menos de 2 velas válidas) para calcular retornos.")
+
+        nan = float("nan")
+        total_up, total_down = self.alc, self.baj  # cada vela UP/DOWN pertenece a una racha
+        return {
+            "velas": total,
+            "pct_alc": self.alc / total * 100,
+            "pct_baj": self.baj / total * 100,
+            "pct_plan": self.pla / total * 100,
+            "int_up": self.suma_up / self.alc * 100 if self.alc else nan,
+            "int_baj": self.suma_down / self.baj * 100 if self.baj else nan,
+            "int_baj_abs": -self.suma_down / self.baj * 100 if self.baj else nan,
+            "racha_up_avg": total_up / self.rachas_up if self.rachas_up else 0,
+            "racha_up_max": self.max_up,
+            "racha_down_avg": total_down / self.rachas_down if self.rachas_down else 0,
+            "racha_down_max": self.max_down,
+            "pct_tiempo_up": total_up / total * 100,
+            "pct_tiempo_down": total_down / total * 100,
+        }
+
+    # ---------- checkpoint ----------
+
+    def a_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def desde_dict(cls, estado: dict) -> "AcumuladorImpulso":
+        acc = cls()
+        for k, v in estado.items():
+            if hasattr(acc, k):
+                setattr(acc, k, v)
+        return acc
+
+    def guardar(self, ruta: str):
+        """
+        Checkpoint atómico (archivo temporal + replace).
+        """
+        tmp = f"{ruta}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f)
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "AcumuladorImpulso":
+        if not os.path.exists(ruta):
+            return cls()
+        with open(ruta, encoding="utf-8") as f:
+            return cls.desde_dict(json.load(f))
+
+
+def actualizar_monitor(ticker: str, interval: str, ruta_checkpoint: str, period: str = "30d") -> dict:
+    """
+    Un ciclo de monitoreo en vivo: carga el checkpoint, agrega las velas
+    cerradas nuevas (bar_store solo baja la cola) y vuelve a guardar.
+    La última vela se omite si aún está en formación; entra en el ciclo siguiente.
+    """
+    acc = AcumuladorImpulso.cargar(ruta_checkpoint)
+    df = descargar_datos(ticker, period, interval, columnas=["Close"])
+
+    # 1wk / 1mo: sin duración fija, la última vela siempre espera al ciclo siguiente
+    duracion = duracion_intervalo(interval)
+    ultima = df.index[-1]
+    ahora = pd.Timestamp.now(tz=ultima.tz) if ultima.tz is not None else pd.Timestamp.now()
+    if duracion is None or ultima + duracion > ahora:
+        df = df.iloc[:-1]
+
+    acc.actualizar_df(df)
+    acc.guardar(ruta_checkpoint)
+    return acc.resultado()
+
+
+# =========================
+# WATCHLIST (varios tickers)
+# =========================
+
+COLUMNAS_RANKING = [
+    "ticker", "period", "interval", "velas",
+    "pct_alc", "pct_baj", "int_up", "int_baj_abs",
+    "racha_up_avg", "racha_down_avg", "racha_up_max", "racha_down_max",
+    "pct_tiempo_up", "pct_tiempo_down",
+]
+
+
+def _analizar_close(close: np.ndarray) -> dict:
+    # En un proceso aparte: solo viaja el array de cierres, no el DataFrame.
+    # Un ticker con menos de 2 velas válidas queda como fila de error (no
+    # aborta el pool.map de todo el escaneo)
+    try:
+        return analizar_close(close)
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+def escanear_watchlist(
+    tickers: list[str],
+    periods: list[str] = ("30d",),
+    intervals: list[str] = ("5m",),
+    max_workers: int | None = None,
+    remuestreo: bool = False,
+) -> pd.DataFrame:
+    """
+    Analiza N tickers × periodos × intervalos:
+    - una descarga en bloque por (periodo, intervalo) vía bar_store
+      (remuestreo=True: una sola por periodo, en el intervalo más fino,
+      y el resto se arma localmente con remuestrear)
+    - analizar_impulso repartido en un pool de procesos
+    Devuelve una tabla ordenada por % alcista, racha media UP e intensidad UP.
+    max_workers=1 -> todo en el proceso actual (sin pool).
+    """
+    tickers = [t.strip().upper() for t in tickers if t.strip()]
+    tareas, filas = [], []
+
+    for period in periods:
+        base = None
+        if remuestreo:
+            base = min(intervals, key=lambda tf: duracion_intervalo(tf) or pd.Timedelta.max)
+            bars_base = bar_store.get_bars_many(tickers, period, base, columns=["Close"], adjusted=True)
+        for interval in intervals:
+            if base is None:
+                bars = bar_store.get_bars_many(tickers, period, interval, columns=["Close"], adjusted=True)
+            elif interval == base:
+                bars = bars_base
+            else:
+                bars = {t: remuestrear(df, interval) for t, df in bars_base.items()
+                        if df is not None and not df.empty and "Close" in df.columns}
+            for ticker in tickers:
+                df = bars.get(ticker)
+                if df is None or df.empty or "Close" not in df.columns:
+                    filas.append({"ticker": ticker, "period": period, "interval": interval,
+                                  "error": "Sin datos (periodo/intervalo no disponible en Yahoo)"})
+                    continue
+                tareas.append(((ticker, period, interval), df["Close"].to_numpy()))
+
+    workers = max_workers or min(len(tareas), os.cpu_count() or 1) or 1
+    closes = [close for _, close in tareas]
+    if workers > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = pool.map(_analizar_close, closes, chunksize=max(1, len(tareas) // (4 * workers)))
+            resultados = list(resultados)
+    else:
+        resultados = [_analizar_close(close) for close in closes]
+
+    for ((ticker, period, interval), _), r in zip(tareas, resultados):
+        filas.append({"ticker": ticker, "period": period, "interval": interval, **r})
+
+    tabla = pd.DataFrame(filas)
+    for col in COLUMNAS_RANKING + ["error"]:
+        if col not in tabla.columns:
+            tabla[col] = np.nan
+    tabla = tabla[COLUMNAS_RANKING + ["error"]]
+
+    tabla = tabla.sort_values(
+        ["pct_alc", "racha_up_avg", "int_up"], ascending=False, na_position="last"
+    ).reset_index(drop=True)
+    tabla.insert(0, "rank", range(1, len(tabla) + 1))
+    return tabla
+
+
+FORMATOS = ("table", "csv", "json", "parquet")
+
+
+def formato_por_extension(ruta: str) -> str:
+    ext = os.path.splitext(ruta)[1].lower().lstrip(".")
+    return ext if ext in FORMATOS else "csv"
+
+
+def guardar_tabla(tabla: pd.DataFrame, ruta: str, formato: str | None = None):
+    """
+    Guarda la tabla según el formato (o la extensión): csv, json, parquet
+    o table (texto alineado). Parquet requiere pyarrow.
+    """
+    formato = formato or formato_por_extension(ruta)
+    if formato == "json":
+        tabla.to_json(ruta, orient="records", indent=2, force_ascii=False)
+    elif formato == "parquet":
+        try:
+            tabla.to_parquet(ruta, index=False)
+        except ImportError as e:
+            raise ValueError("Para guardar en Parquet instala pyarrow (pip install pyarrow).") from e
+    elif formato == "table":
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(tabla.round(4).to_string(index=False) + "\n")
+    else:
+        tabla.to_csv(ruta, index=False)
+
 
 def imprimir(ticker, period, interval, r):
     print(f"\n=== RESULTADOS PARA {ticker} ===")
@@ -170,23 +849,122 @@ def imprimir(ticker, period, interval, r):
 # MAIN
 # =========================
 
-if __name__ == "__main__":
+def modo_interactivo():
     print("=== ANALIZADOR DE IMPULSO (SPY / CUALQUIER TICKER) ===")
 
     while True:
-        ticker = pedir("Ticker (SPY, QQQ, NVDA, BTC-USD...)", "SPY").upper()
+        ticker = pedir("Ticker (SPY, QQQ, NVDA, BTC-USD... o varios separados por coma)", "SPY").upper()
         period = pedir("Periodo (1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max)", "30d")
         interval = menu_intervalo()
 
         # recomendación mínima rápida:
         # si eliges 1m, evita periodos muy largos
         try:
-            df = descargar_datos(ticker, period, interval)
-            resultados = analizar_impulso(df)
-            imprimir(ticker, period, interval, resultados)
+            if interval == "multi" and "," not in ticker:
+                tabla = analizar_multitemporal(ticker, period)
+                print(f"\n=== {ticker} | Periodo: {period} | una descarga, remuestreo local ===\n")
+                print(tabla.T.round(4).to_string())
+                print()
+            elif "," in ticker:
+                if interval == "multi":
+                    interval = "5m"
+                    print("Multi-temporalidad es solo para un ticker; la watchlist usa 5m.")
+                # Watchlist: tabla ordenada en vez de un reporte por ticker
+                tabla = escanear_watchlist(ticker.split(","), [period], [interval])
+                print()
+                print(tabla.drop(columns=["error"]).round(4).to_string(index=False))
+                ruta = pedir("Guardar tabla (.csv/.json/.parquet, Enter=no guardar)", "").strip()
+                if ruta:
+                    guardar_tabla(tabla, ruta)
+                    print(f"Tabla guardada en {ruta}")
+            else:
+                df = descargar_datos(ticker, period, interval)
+                resultados = analizar_impulso(df)
+                imprimir(ticker, period, interval, resultados)
         except Exception as e:
             print("\nERROR:", e, "\n")
 
         otra = input("¿Analizar otro? (s/n): ").strip().lower()
         if otra != "s":
             break
+
+
+def _lista(valores: list[str]) -> list[str]:
+    # Acepta "SPY,QQQ NVDA" (coma y/o espacios, argumento repetido)
+    return [v.strip() for texto in valores or [] for v in texto.split(",") if v.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Sin argumentos abre el menú interactivo. Ejemplos:
+
+        python analizador_impulso.py -t SPY,QQQ,NVDA -p 30d -i 5m,15m,1h -o impulso.csv
+        python analizador_impulso.py --tickers-file watchlist.txt -i 5m,1h,1d --remuestreo -f json
+        python analizador_impulso.py -t SPY,SLV -p 1y -i 1m --perfil 30min -o perfil.csv
+    """
+    import argparse
+    import sys
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        modo_interactivo()
+        return 0
+
+    ap = argparse.ArgumentParser(description="Estadísticas de impulso por lotes (watchlist × periodos × intervalos).")
+    ap.add_argument("-t", "--tickers", nargs="+", default=[], help="Tickers separados por coma o espacio")
+    ap.add_argument("--tickers-file", help="Archivo con un ticker por línea (# = comentario)")
+    ap.add_argument("-p", "--periods", nargs="+", default=["30d"], help="Periodos de Yahoo (30d, 3mo, 1y...)")
+    ap.add_argument("-i", "--intervals", nargs="+", default=["5m"], help="Intervalos (1m, 5m, 15m, 30m, 1h, 1d...)")
+    ap.add_argument("-f", "--format", choices=FORMATOS, help="Formato de salida (por defecto según -o, o table)")
+    ap.add_argument("-o", "--output", help="Archivo de salida (sin -o se imprime en pantalla)")
+    ap.add_argument("-w", "--workers", type=int, help="Procesos para el análisis (1 = sin pool)")
+    ap.add_argument("--remuestreo", action="store_true",
+                    help="Una sola descarga por periodo en el intervalo más fino; el resto se remuestrea")
+    ap.add_argument("--perfil", metavar="BLOQUE",
+                    help="Perfil por tramo horario de la sesión (15min, 30min, 1h...) en vez del ranking")
+    ap.add_argument("--offline", action="store_true", help="Solo velas ya guardadas en bar_store (sin red)")
+    args = ap.parse_args(argv)
+
+    tickers = _lista(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file, encoding="utf-8") as f:
+            tickers += _lista([line.split("#", 1)[0] for line in f])
+    if not tickers:
+        ap.error("indica al menos un ticker con -t o --tickers-file")
+
+    formato = args.format or (formato_por_extension(args.output) if args.output else "table")
+    if formato == "parquet" and not args.output:
+        ap.error("el formato parquet necesita -o/--output")
+    if args.offline:
+        bar_store.OFFLINE = True
+
+    if args.perfil:
+        tabla = perfiles_horarios(tickers, _lista(args.periods), _lista(args.intervals), args.perfil)
+        if tabla.empty:
+            print("Sin datos para el perfil horario.", file=sys.stderr)
+            return 1
+    else:
+        tabla = escanear_watchlist(
+            tickers, _lista(args.periods), _lista(args.intervals),
+            max_workers=args.workers, remuestreo=args.remuestreo,
+        )
+
+    if args.output:
+        guardar_tabla(tabla, args.output, formato)
+        print(f"{len(tabla)} filas guardadas en {args.output}", file=sys.stderr)
+    elif formato == "json":
+        print(tabla.to_json(orient="records", indent=2, force_ascii=False))
+    elif formato == "csv":
+        print(tabla.to_csv(index=False), end="")
+    else:
+        print(tabla.round(4).to_string(index=False))
+
+    errores = tabla["error"].notna() if "error" in tabla.columns else pd.Series(False, index=tabla.index)
+    for _, fila in tabla[errores].iterrows():
+        print(f"AVISO {fila['ticker']} {fila['period']} {fila['interval']}: {fila['error']}", file=sys.stderr)
+    # Código 1 si no salió ninguna fila válida (útil para tareas programadas)
+    return 1 if errores.all() else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,15 +3,23 @@ import pandas as pd
 from datetime import datetime
 import os
 
+import diario
+
 # ===============================
 # Import Macro Checklist (Auto)
 # ===============================
 try:
     import checklist_macro_auto as macro
+    import macro_metrics
 except Exception as e:
     macro = None
     import_error = e
 
+try:
+    import impulso_cache
+except Exception:
+    impulso_cache = None  # El plan de trade funciona igual sin el resumen de impulso
+
 st.set_page_config(page_title="📊 Plan Diario de Trading", layout="centered")
 
 # ===============================
@@ -62,8 +70,7 @@ COLUMNS = [
     "acepto_perder_financiero",
 ]
 
-if not os.path.exists(CSV_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(CSV_FILE, index=False)
+diario.inicializar(CSV_FILE, COLUMNS)
 
 # ===============================
 # Sidebar - Reglas Mentales
@@ -104,7 +111,6 @@ if macro is None:
     st.stop()
 
 
-@st.cache_data(ttl=300)  # cache 5 min
 def get_macro_snapshot():
     """
     Snapshot macro robusto: nunca debe tumbar el dashboard.
@@ -113,26 +119,12 @@ def get_macro_snapshot():
     """
     errors = []
 
-    def safe_signal(primary: str, fallback: str | None = None, label_name: str = ""):
-        nonlocal errors
-        try:
-            return macro.get_yahoo_signal(primary, macro.DEADBAND_PCT), primary
-        except Exception as e:
-            errors.append(f"{label_name or primary} falló con {primary}: {e}")
-            if fallback:
-                try:
-                    return macro.get_yahoo_signal(fallback, macro.DEADBAND_PCT), fallback
-                except Exception as e2:
-                    errors.append(f"{label_name or primary} fallback falló con {fallback}: {e2}")
-
-            # Último recurso: señal neutra (no tumba la app)
-            neutral = macro.Signal(label="⏸️", change_pct=0.0, last=0.0, prev=0.0)
-            return neutral, "N/A"
-
-    # Señales con fallback
-    es, es_src = safe_signal("ES=F", fallback="SPY", label_name="Futuros ES")
-    vix, vix_src = safe_signal("^VIX", fallback="VIXY", label_name="VIX")
-    dxy, dxy_src = safe_signal("DX-Y.NYB", fallback="UUP", label_name="DXY")
+    # Señales con fallback: principales + fallbacks en una sola descarga
+    # (si faltan ambos, principal/fallback en modo hedged con tope de tiempo)
+    sigs = macro.safe_signals(macro.MACRO_TICKERS, macro.DEADBAND_PCT, errors=errors)
+    es, es_src = sigs["es"].signal, sigs["es"].source
+    vix, vix_src = sigs["vix"].signal, sigs["vix"].source
+    dxy, dxy_src = sigs["dxy"].signal, sigs["dxy"].source
 
     # Noticias alto impacto (ForexFactory) con try/except
     try:
@@ -143,7 +135,8 @@ def get_macro_snapshot():
 
     # Modo macro
     try:
-        macro_mode, macro_rule = macro.determine_macro_mode(es, vix, dxy, has_high)
+        with macro_metrics.span("determine_macro_mode"):
+            macro_mode, macro_rule = macro.determine_macro_mode(es, vix, dxy, has_high)
     except Exception as e:
         macro_mode, macro_rule = "🟡 Neutral", "Regla anti-sabotaje: SOLO setups A+."
         errors.append(f"determine_macro_mode falló: {e}")
@@ -151,6 +144,7 @@ def get_macro_snapshot():
     return {
         "es": es, "vix": vix, "dxy": dxy,
         "es_src": es_src, "vix_src": vix_src, "dxy_src": dxy_src,
+        "timings": {name: f.elapsed_s for name, f in sigs.items()},
         "has_high": has_high, "events": events,
         "macro_mode": macro_mode, "macro_rule": macro_rule,
         "lookahead_hours": macro.LOOKAHEAD_HOURS,
@@ -158,20 +152,63 @@ def get_macro_snapshot():
     }
 
 
+@st.cache_resource
+def get_macro_refresher():
+    """
+    Un solo refresher por proceso: recalcula el snapshot en segundo plano
+    cada MACRO_REFRESH_S y todas las sesiones leen el último valor bueno.
+    """
+    def compute():
+        with macro_metrics.span("macro_snapshot"):
+            snap = get_macro_snapshot()
+            # Todo neutro = Yahoo caído: se lanza para que el refresher
+            # conserve el último snapshot bueno y anote el error
+            if all(snap[f"{k}_src"] == "N/A" for k in ("es", "vix", "dxy")):
+                detalle = "; ".join(snap["errors"][-3:])
+                raise RuntimeError(f"Sin datos de Yahoo para ES/VIX/DXY ({detalle})")
+            return snap
+
+    return macro.MacroRefresher(compute, interval_s=macro.MACRO_REFRESH_S).start()
+
+
+refresher = get_macro_refresher()
+
 colA, colB = st.columns([1, 1])
 with colA:
     if st.button("🔄 Actualizar Macro (forzar)"):
-        st.cache_data.clear()
+        # Solo invalida el snapshot macro (no el resto de caches de la app)
+        refresher.refresh_now()
 
-snap = get_macro_snapshot()
+snap, snap_age = refresher.get()
+if snap is None:
+    st.error(f"No se pudo calcular el snapshot macro: {refresher.last_error}")
+    st.stop()
+
+with colB:
+    edad_min = (snap_age or 0) / 60
+    if snap_age is not None and snap_age > 2 * macro.MACRO_REFRESH_S:
+        st.warning(f"🕒 Macro desactualizado: hace {edad_min:.0f} min")
+    else:
+        st.caption(f"🕒 Macro actualizado hace {edad_min:.1f} min")
+    if refresher.last_error:
+        st.caption(f"⚠️ Último recálculo falló (se muestra el anterior): {refresher.last_error}")
 
 # Avisos técnicos
-if snap.get("errors"):
+breakers = macro.circuit_status()
+if snap.get("errors") or breakers:
     with st.expander("⚠️ Macro: avisos técnicos (Yahoo / calendario)"):
-        for msg in snap["errors"]:
+        for msg in snap.get("errors", []):
             st.write(f"- {msg}")
-
-st.caption(f"Fuentes: ES={snap.get('es_src')} | VIX={snap.get('vix_src')} | DXY={snap.get('dxy_src')}")
+        if breakers:
+            st.caption("Circuit breaker por ticker (sin llamadas a Yahoo mientras esté abierto)")
+            st.dataframe(pd.DataFrame(breakers), use_container_width=True, hide_index=True)
+
+timings = snap.get("timings", {})
+st.caption(
+    f"Fuentes: ES={snap.get('es_src')} ({timings.get('es', 0):.1f}s) | "
+    f"VIX={snap.get('vix_src')} ({timings.get('vix', 0):.1f}s) | "
+    f"DXY={snap.get('dxy_src')} ({timings.get('dxy', 0):.1f}s)"
+)
 
 # Guardamos en session_state para gates + guardado
 st.session_state["macro_mode"] = snap["macro_mode"]
@@ -191,6 +228,20 @@ if snap["has_high"]:
         for e in snap["events"]:
             st.write(f"- {e['date']} {e['time']} | {e['title']} ({e['country']} / {e['impact']})")
 
+@st.cache_data(ttl=60, show_spinner=False)
+def resumen_metricas_24h():
+    # El cuerpo del expander corre en cada rerun: no re-parsear el JSONL cada vez
+    return macro_metrics.summarize(macro_metrics.load_metrics(since_s=24 * 3600))
+
+
+with st.expander("🩺 Macro: diagnóstico (latencias últimas 24h)"):
+    resumen = resumen_metricas_24h()
+    if resumen:
+        st.dataframe(pd.DataFrame(resumen).round(1), use_container_width=True, hide_index=True)
+        st.caption(f"Fuente: {macro_metrics.METRICS_PATH.name} (p50/p95 por etapa; % de cache hit, fallback, hedged)")
+    else:
+        st.caption("Aún no hay métricas registradas.")
+
 st.markdown("---")
 
 # ===============================
@@ -210,8 +261,7 @@ COLUMNS = [
     "estado_emocional", "checklist_ok"
 ]
 
-if not os.path.exists(CSV_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(CSV_FILE, index=False)
+diario.inicializar(CSV_FILE, COLUMNS)
 
 # ===============================
 # HEADER
@@ -399,6 +449,23 @@ timeframe = st.selectbox(
     key="timeframe"
 )
 
+# Impulso del activo en el timeframe elegido (mismo cache que la página de impulso)
+if impulso_cache is not None:
+    tf_impulso = impulso_cache.intervalo_yahoo(timeframe)
+    periodo_impulso = impulso_cache.PERIODO_POR_INTERVALO.get(tf_impulso, "30d")
+    # El cuerpo de un expander corre aunque esté cerrado: la descarga (4h = 1 año
+    # de velas de 1h la primera vez) solo se hace si se pide, para no frenar el plan
+    ver_impulso = st.checkbox(
+        f"⚡ Ver impulso de {activo} ({tf_impulso}, {periodo_impulso})", value=False, key="ver_impulso"
+    )
+    if ver_impulso:
+        try:
+            with st.spinner(f"Analizando impulso de {activo}..."):
+                impulso_activo = impulso_cache.analisis(activo, periodo_impulso, tf_impulso)
+            impulso_cache.render_resumen(impulso_activo)
+        except Exception as e:
+            st.caption(f"Impulso no disponible: {e}")
+
 # ===============================
 # CONTEXTO
 # ===============================
@@ -694,8 +761,6 @@ puede_guardar = all([
 st.markdown("---")
 
 def guardar_trade():
-    df = pd.read_csv(CSV_FILE)
-
     nuevo = {
         "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "activo": activo,
@@ -739,13 +804,9 @@ def guardar_trade():
         "acepto_perder_financiero": bool(acepto_perder_financiero),
     }
 
-    # Asegurar columnas (retro-compat)
-    for col in COLUMNS:
-        if col not in df.columns:
-            df[col] = pd.NA
-
-    df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
-    df.to_csv(CSV_FILE, index=False)
+    # Append de una sola fila. Este COLUMNS (el corto de arriba) no tiene todos
+    # los campos del formulario: la fila completa define su esquema, como en app_2
+    diario.agregar(CSV_FILE, nuevo, list(dict.fromkeys([*COLUMNS, *nuevo])))
 
 if not puede_guardar:
     st.button("🚫 Guardar Trade (bloqueado)", disabled=True)
@@ -799,14 +860,14 @@ else:
 # Tabla de últimos registros
 # ===============================
 st.markdown("## 📑 Últimos Trades Registrados")
-df_show = pd.read_csv(CSV_FILE)
-st.dataframe(df_show.tail(20), use_container_width=True)
+df_show = diario.ultimos(CSV_FILE, 20)
+st.dataframe(df_show, use_container_width=True)
 
 st.markdown("---")
 st.subheader("📤 Exportar Trades")
 
 def generar_excel():
-    df = pd.read_csv(CSV_FILE)
+    df = diario.leer(CSV_FILE)
     nombre_archivo = f"diario_trading_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
     df.to_excel(nombre_archivo, index=False)
     return nombre_archivo
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 from datetime import date, datetime
-import os
+
+import diario
 
 STORAGE_FILE = "diario_trading.csv"
 
@@ -356,25 +357,19 @@ if st.button("💾 Guardar diario de hoy"):
         "plan_enfriamiento": plan_enfriamiento,
     }
 
-    # Guardar en CSV
-    if os.path.exists(STORAGE_FILE):
-        df_old = pd.read_csv(STORAGE_FILE)
-        df_new = pd.concat([df_old, pd.DataFrame([registro])], ignore_index=True)
-    else:
-        df_new = pd.DataFrame([registro])
-
-    df_new.to_csv(STORAGE_FILE, index=False, encoding="utf-8-sig")
-    st.success("✅ Diario guardado correctamente en 'diario_trading.csv'.")
+    # Guardar en el diario (una fila, sin reescribir el histórico)
+    diario.agregar(STORAGE_FILE, registro, list(registro))
+    st.success("✅ Diario guardado correctamente.")
 
-    st.dataframe(df_new.tail(5))
+    st.dataframe(diario.ultimos(STORAGE_FILE, 5))
 
 # -------------------------
 # Sección opcional: Historial
 # -------------------------
 st.markdown("## 📊 Historial reciente")
 
-if os.path.exists(STORAGE_FILE):
-    df_hist = pd.read_csv(STORAGE_FILE)
+df_hist = diario.leer(STORAGE_FILE) if diario.existe(STORAGE_FILE) else pd.DataFrame()
+if not df_hist.empty:
     df_hist["fecha"] = pd.to_datetime(df_hist["fecha"])
     df_hist = df_hist.sort_values(by="fecha", ascending=False)
 
@@ -1,20 +1,20 @@
 
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import os
+
+import diario
 
 st.set_page_config(page_title="📊 Plan Diario de Trading", layout="centered")
 
 CSV_FILE = "diario_trading.csv"
 
-if not os.path.exists(CSV_FILE):
-    df_init = pd.DataFrame(columns=[
-        "fecha","activo","tipo_trade","direccion",
-        "entrada","stop","target",
-        "invalidacion","estado_emocional","checklist_ok"
-    ])
-    df_init.to_csv(CSV_FILE, index=False)
+COLUMNS = [
+    "fecha","activo","tipo_trade","direccion",
+    "entrada","stop","target",
+    "invalidacion","estado_emocional","checklist_ok"
+]
+
+diario.inicializar(CSV_FILE, COLUMNS)
 
 st.sidebar.markdown("""
 ## 🧠 Reglas de Oro
@@ -59,14 +59,13 @@ estado_ok = estado == "🟢 Calmo"
 puede_guardar = invalidacion_ok and checklist_ok and estado_ok
 
 def guardar():
-    df = pd.read_csv(CSV_FILE)
-    df.loc[len(df)] = [
+    valores = [
         datetime.now().strftime("%Y-%m-%d %H:%M"),
         activo,tipo_trade,direccion,
         entrada,stop,target,
         invalidacion,estado,checklist_ok
     ]
-    df.to_csv(CSV_FILE,index=False)
+    diario.agregar(CSV_FILE, dict(zip(COLUMNS, valores)), COLUMNS)
 
 if not puede_guardar:
     st.button("🚫 Guardar (bloqueado)",disabled=True)
@@ -76,4 +75,4 @@ else:
         st.success("Trade guardado con disciplina")
 
 st.markdown("## 📑 Últimos trades")
-st.dataframe(pd.read_csv(CSV_FILE).tail(10))
+st.dataframe(diario.ultimos(CSV_FILE, 10))
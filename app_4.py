@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import os
+
+import diario
 
 st.set_page_config(page_title="📊 Plan Diario de Trading", layout="centered")
 
@@ -27,8 +27,7 @@ COLUMNS = [
     "checklist_intradia_ok",
 ]
 
-if not os.path.exists(CSV_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(CSV_FILE, index=False)
+diario.inicializar(CSV_FILE, COLUMNS)
 
 # ===============================
 # Sidebar - Reglas Mentales
@@ -254,8 +253,6 @@ puede_guardar = all([
 st.markdown("---")
 
 def guardar_trade():
-    df = pd.read_csv(CSV_FILE)
-
     nuevo = {
         "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "activo": activo,
@@ -273,13 +270,8 @@ def guardar_trade():
         "checklist_intradia_ok": checklist_intradia_ok,
     }
 
-    # Asegura columnas (por si el CSV viejo no las tiene)
-    for col in COLUMNS:
-        if col not in df.columns:
-            df[col] = pd.NA
-
-    df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
-    df.to_csv(CSV_FILE, index=False)
+    # Append de una sola fila (valida contra COLUMNS; columnas nuevas -> versión de encabezado)
+    diario.agregar(CSV_FILE, nuevo, COLUMNS)
 
 if not puede_guardar:
     st.button("🚫 Guardar Trade (bloqueado)", disabled=True)
@@ -311,8 +303,8 @@ else:
 # Tabla de últimos registros
 # ===============================
 st.markdown("## 📑 Últimos Trades Registrados")
-df_show = pd.read_csv(CSV_FILE)
-st.dataframe(df_show.tail(20), use_container_width=True)
+df_show = diario.ultimos(CSV_FILE, 20)
+st.dataframe(df_show, use_container_width=True)
 
 # ===============================
 # Templates rápidos intraday SLV Call/Put
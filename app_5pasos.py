@@ -1,8 +1,9 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import os
 
+import diario
+
 # ===============================
 # CONFIGURACIÓN GENERAL
 # ===============================
@@ -20,8 +21,7 @@ COLUMNS = [
     "estado_emocional", "checklist_ok"
 ]
 
-if not os.path.exists(CSV_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(CSV_FILE, index=False)
+diario.inicializar(CSV_FILE, COLUMNS)
 
 # ===============================
 # HEADER
@@ -159,7 +159,6 @@ puede_guardar = all([
 ])
 
 def guardar_trade():
-    df = pd.read_csv(CSV_FILE)
     nuevo = {
         "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "activo": activo,
@@ -172,8 +171,7 @@ def guardar_trade():
         "estado_emocional": estado_emocional,
         "checklist_ok": checklist_ok
     }
-    df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
-    df.to_csv(CSV_FILE, index=False)
+    diario.agregar(CSV_FILE, nuevo, COLUMNS)
 
 if puede_guardar:
     if st.button("💾 Guardar Trade"):
@@ -187,5 +185,5 @@ else:
 # HISTORIAL
 # ===============================
 st.markdown("## 📑 Últimos Trades")
-df_show = pd.read_csv(CSV_FILE)
-st.dataframe(df_show.tail(15), use_container_width=True)
+df_show = diario.ultimos(CSV_FILE, 15)
+st.dataframe(df_show, use_container_width=True)
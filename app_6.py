@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import os
+
+import diario
 
 # ===============================
 # Import Macro Checklist (Auto)
@@ -62,8 +62,7 @@ COLUMNS = [
     "acepto_perder_financiero",
 ]
 
-if not os.path.exists(CSV_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(CSV_FILE, index=False)
+diario.inicializar(CSV_FILE, COLUMNS)
 
 # ===============================
 # Sidebar - Reglas Mentales
@@ -534,8 +533,6 @@ puede_guardar = all([
 st.markdown("---")
 
 def guardar_trade():
-    df = pd.read_csv(CSV_FILE)
-
     nuevo = {
         "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "activo": activo,
@@ -578,13 +575,8 @@ def guardar_trade():
         "acepto_perder_financiero": bool(acepto_perder_financiero),
     }
 
-    # Asegurar columnas (retro-compat)
-    for col in COLUMNS:
-        if col not in df.columns:
-            df[col] = pd.NA
-
-    df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
-    df.to_csv(CSV_FILE, index=False)
+    # Append de una sola fila (valida contra COLUMNS; columnas nuevas -> versión de encabezado)
+    diario.agregar(CSV_FILE, nuevo, COLUMNS)
 
 if not puede_guardar:
     st.button("🚫 Guardar Trade (bloqueado)", disabled=True)
@@ -638,8 +630,8 @@ else:
 # Tabla de últimos registros
 # ===============================
 st.markdown("## 📑 Últimos Trades Registrados")
-df_show = pd.read_csv(CSV_FILE)
-st.dataframe(df_show.tail(20), use_container_width=True)
+df_show = diario.ultimos(CSV_FILE, 20)
+st.dataframe(df_show, use_container_width=True)
 
 with st.expander("📌 Templates rápidos (intraday real)"):
     st.markdown("""
@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+import macro_fixtures
+
+# =========================
+# Configuración
+# =========================
+DB_PATH = Path(__file__).parent / "bars_cache.db"
+FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+_SQL_FIELDS = ["open", "high", "low", "close", "adj_close", "volume"]
+
+# Segundos mínimos entre refrescos de red para (ticker, intervalo).
+# Dentro de esta ventana se sirve directo desde el disco.
+REFRESH_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+    "60m": 3600, "90m": 3600, "1h": 3600,
+    "1d": 300, "5d": 3600, "1wk": 3600, "1mo": 3600, "3mo": 3600,
+}
+
+# Límites de Yahoo para velas intradía: (máximo por pedido, antigüedad máxima).
+# Rangos más largos se parten en ventanas que se piden en paralelo; lo que
+# queda guardado se conserva, así el histórico crece más allá de la antigüedad.
+INTRADAY_LIMITS = {
+    "1m": (timedelta(days=7), timedelta(days=29)),
+    "2m": (timedelta(days=59), timedelta(days=59)),
+    "5m": (timedelta(days=59), timedelta(days=59)),
+    "15m": (timedelta(days=59), timedelta(days=59)),
+    "30m": (timedelta(days=59), timedelta(days=59)),
+    "90m": (timedelta(days=59), timedelta(days=59)),
+    "60m": (timedelta(days=180), timedelta(days=729)),
+    "1h": (timedelta(days=180), timedelta(days=729)),
+}
+PAGE_WORKERS = 4                       # Ventanas en paralelo (Yahoo limita la tasa de pedidos)
+
+# BAR_STORE_OFFLINE=1 -> nunca toca la red, solo lo que ya está guardado
+OFFLINE = os.getenv("BAR_STORE_OFFLINE", "").strip() in {"1", "true", "yes"}
+
+
+# =========================
+# DB helpers
+# =========================
+def get_conn():
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_db():
+    with get_conn() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bars (
+                ticker TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+                PRIMARY KEY (ticker, interval, ts)
+            ) WITHOUT ROWID
+            """
+        )
+        # covered_from: inicio (epoch) más antiguo ya pedido a Yahoo (NULL = "max")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bars_meta (
+                ticker TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                tz TEXT DEFAULT '',
+                covered_from REAL,
+                fetched_at REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (ticker, interval)
+            )
+            """
+        )
+
+
+def period_start(period: str, now: datetime | None = None) -> datetime | None:
+    """
+    Traduce el 'period' de Yahoo (5d, 1mo, 3mo, 1y, ytd, max...) a fecha de inicio UTC.
+    None = todo el histórico.
+    """
+    now = now or datetime.now(timezone.utc)
+    p = period.strip().lower()
+    if p == "max":
+        return None
+    if p == "ytd":
+        return datetime(now.year, 1, 1, tzinfo=timezone.utc)
+
+    for suffix, days in (("mo", 30), ("wk", 7), ("y", 365), ("d", 1)):
+        if p.endswith(suffix) and p[: -len(suffix)].isdigit():
+            return now - timedelta(days=int(p[: -len(suffix)]) * days)
+
+    raise ValueError(f"Periodo no reconocido: {period}")
+
+
+# =========================
+# Red (únicos puntos que llaman a Yahoo)
+# =========================
+def _download(tickers: list[str], interval: str, period: str | None = None, start=None) -> pd.DataFrame:
+    return yf.download(
+        tickers,
+        period=period,
+        start=start,
+        interval=interval,
+        group_by="ticker",
+        auto_adjust=False,
+        threads=True,
+        progress=False,
+    )
+
+
+def _download_window(ticker: str, interval: str, start: datetime, end: datetime) -> pd.DataFrame:
+    # yf.download comparte estado global entre llamadas: para ventanas en
+    # paralelo se usa Ticker.history (un objeto por pedido)
+    return yf.Ticker(ticker).history(
+        start=start,
+        end=end,
+        interval=interval,
+        auto_adjust=False,
+        actions=False,
+        raise_errors=True,
+    )
+
+
+def page_windows(interval: str, start: datetime | None, end: datetime | None = None) -> list[tuple[datetime, datetime]]:
+    """
+    Parte [start, end] en ventanas que Yahoo acepta para `interval`.
+    El inicio se recorta a la antigüedad máxima (None = lo más viejo posible).
+    """
+    chunk, lookback = INTRADAY_LIMITS[interval]
+    end = end or datetime.now(timezone.utc)
+    start = max(start or end - lookback, end - lookback)
+    windows = []
+    while start < end:
+        windows.append((start, min(start + chunk, end)))
+        start += chunk
+    return windows
+
+
+def _download_paginated(tickers: list[str], interval: str, start: datetime | None) -> tuple[dict[str, pd.DataFrame], set[str]]:
+    """
+    Pide cada (ticker, ventana) en paralelo, une y quita duplicados por
+    timestamp (gana la ventana más reciente). Devuelve (frames, tickers con
+    alguna ventana fallida).
+    """
+    windows = page_windows(interval, start)
+    tasks = [(t, a, b) for t in tickers for a, b in windows]
+
+    def fetch(task):
+        ticker, a, b = task
+        try:
+            return ticker, _frame_for(_download_window(ticker, interval, a, b), ticker), None
+        except Exception as e:
+            return ticker, None, e
+
+    parts: dict[str, list[pd.DataFrame]] = {t: [] for t in tickers}
+    failed = set()
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="bars-page") as pool:
+        for ticker, df, err in pool.map(fetch, tasks):
+            if err is not None:
+                failed.add(ticker)
+            elif df is not None and not df.empty:
+                parts[ticker].append(df)
+
+    frames = {}
+    for ticker, dfs in parts.items():
+        if dfs:
+            df = pd.concat(dfs).sort_index()
+            frames[ticker] = df[~df.index.duplicated(keep="last")]
+    return frames, failed
+
+
+def _needs_pages(interval: str, start: datetime | None) -> bool:
+    limits = INTRADAY_LIMITS.get(interval)
+    if limits is None:
+        return False
+    return start is None or datetime.now(timezone.utc) - start > limits[0]
+
+
+def _fetch(tickers: list[str], interval: str, period: str | None = None, start=None) -> tuple[dict[str, pd.DataFrame], set[str]]:
+    """
+    Una descarga en bloque o, si el rango excede lo que Yahoo permite por
+    pedido para el intervalo, varias ventanas en paralelo ya unidas.
+    """
+    since = period_start(period) if period else None
+    if start is not None:
+        ts = pd.Timestamp(start)
+        since = (ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")).to_pydatetime()
+    if _needs_pages(interval, since):
+        return _download_paginated(tickers, interval, since)
+
+    data = _download(tickers, interval, period=period, start=start)
+    return {t: _frame_for(data, t) for t in tickers}, set()
+
+
+def _frame_for(data: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """
+    Extrae las columnas OHLCV de un ticker de lo que devuelve yf.download
+    (columnas planas o MultiIndex en cualquier orden de niveles).
+    """
+    if data is None or data.empty:
+        return pd.DataFrame(columns=FIELDS)
+
+    cols = data.columns
+    if isinstance(cols, pd.MultiIndex):
+        if ticker in cols.get_level_values(0):
+            data = data[ticker]
+        elif ticker in cols.get_level_values(1):
+            data = data.xs(ticker, level=1, axis=1)
+        else:
+            return pd.DataFrame(columns=FIELDS)
+
+    data = data.reindex(columns=FIELDS)
+    return data.dropna(how="all")
+
+
+# =========================
+# Lectura / escritura
+# =========================
+def _stored_info(conn, ticker: str, interval: str):
+    row = conn.execute(
+        "SELECT tz, covered_from, fetched_at FROM bars_meta WHERE ticker = ? AND interval = ?",
+        (ticker, interval),
+    ).fetchone()
+    last = conn.execute(
+        "SELECT MAX(ts) FROM bars WHERE ticker = ? AND interval = ?",
+        (ticker, interval),
+    ).fetchone()[0]
+    if row is None:
+        return None, last
+    return {"tz": row[0] or "", "covered_from": row[1], "fetched_at": row[2]}, last
+
+
+def save_bars(ticker: str, interval: str, df: pd.DataFrame, covered_from: float | None = None, full: bool = False):
+    """
+    Inserta/actualiza velas (upsert por timestamp) y marca la hora del refresco.
+    """
+    init_db()
+    df = df.reindex(columns=FIELDS)
+    idx = pd.DatetimeIndex(df.index)
+    tz_name = str(idx.tz) if idx.tz is not None else ""
+    ts = (idx.tz_convert("UTC") if idx.tz is not None else idx).as_unit("s").asi8
+
+    rows = [
+        (ticker, interval, int(t), *[None if pd.isna(v) else float(v) for v in vals])
+        for t, vals in zip(ts, df.itertuples(index=False, name=None))
+    ]
+
+    with get_conn() as conn:
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO bars (ticker, interval, ts, {", ".join(_SQL_FIELDS)})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        meta, _ = _stored_info(conn, ticker, interval)
+        if not full:
+            cov = meta["covered_from"] if meta else (covered_from if covered_from is not None else float(ts.min()))
+        elif covered_from is None or (meta is not None and meta["covered_from"] is None):
+            cov = None  # histórico completo ("max")
+        else:
+            cov = covered_from if meta is None else min(meta["covered_from"], covered_from)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO bars_meta (ticker, interval, tz, covered_from, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (ticker, interval, tz_name or (meta or {}).get("tz", ""), cov, time.time()),
+        )
+
+
+def _select_fields(columns: list[str] | None) -> tuple[list[str], list[str]]:
+    if columns is None:
+        return FIELDS, _SQL_FIELDS
+    pairs = [(f, sql) for f, sql in zip(FIELDS, _SQL_FIELDS) if f in columns]
+    return [f for f, _ in pairs], [sql for _, sql in pairs]
+
+
+def load_bars(
+    ticker: str, interval: str, start: datetime | None = None, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Lee del disco las velas guardadas (desde `start` si se indica).
+    Índice en la zona horaria original de Yahoo; columnas vacías se omiten.
+    columns=["Close"] lee solo esa columna (series largas con poca memoria).
+    """
+    init_db()
+    fields, sql_fields = _select_fields(columns)
+    q = f"SELECT ts, {', '.join(sql_fields)} FROM bars WHERE ticker = ? AND interval = ?"
+    params: list = [ticker, interval]
+    if start is not None:
+        q += " AND ts >= ?"
+        params.append(int(start.timestamp()))
+    q += " ORDER BY ts"
+
+    with get_conn() as conn:
+        rows = conn.execute(q, params).fetchall()
+        meta, _ = _stored_info(conn, ticker, interval)
+
+    df = pd.DataFrame.from_records(rows, columns=["ts", *fields])
+    idx = pd.to_datetime(df.pop("ts"), unit="s", utc=True)
+    tz_name = (meta or {}).get("tz", "")
+    idx = idx.dt.tz_convert(tz_name) if tz_name else idx.dt.tz_localize(None)
+    df.index = pd.DatetimeIndex(idx, name="Datetime" if tz_name else "Date")
+    return df.dropna(axis=1, how="all")
+
+
+def _needs_refresh(meta, last, start: datetime | None, interval: str) -> str | None:
+    """
+    'full' -> falta histórico (primera vez o periodo más largo que lo guardado)
+    'tail' -> solo faltan las velas posteriores a la última guardada
+    None   -> lo guardado está fresco
+    """
+    if meta is None or last is None:
+        return "full"
+    cov = meta["covered_from"]
+    if cov is not None and (start is None or start.timestamp() < cov):
+        return "full"
+    if time.time() - meta["fetched_at"] > REFRESH_SECONDS.get(interval, 300):
+        return "tail"
+    return None
+
+
+def adjust_ohlc(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    OHLC ajustados por dividendos y splits con el factor Adj Close / Close
+    (lo mismo que auto_adjust=True de yfinance). Quita la columna Adj Close.
+    """
+    if "Adj Close" not in df.columns:
+        return df
+    out = df.drop(columns="Adj Close")
+    if "Close" in df.columns:
+        factor = (df["Adj Close"] / df["Close"]).fillna(1.0)
+        for col in ("Open", "High", "Low", "Close"):
+            if col in out.columns:
+                out[col] = out[col] * factor
+    return out
+
+
+def _finish(df: pd.DataFrame, columns: list[str] | None, adjusted: bool) -> pd.DataFrame:
+    if adjusted:
+        df = adjust_ohlc(df)
+    if columns is not None:
+        df = df[[c for c in df.columns if c in columns]]
+    return df
+
+
+def get_bars_many(
+    tickers: list[str], period: str, interval: str, refresh: bool = True,
+    columns: list[str] | None = None, adjusted: bool = False,
+    status: dict[str, str] | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Velas de varios tickers leyendo a través del almacén local.
+    Como mucho 2 descargas en bloque: una con el periodo completo (tickers
+    nuevos) y otra incremental desde la última vela guardada (resto).
+    Si la red falla se devuelve lo que haya en disco.
+    status (si se pasa) se llena con el origen de cada ticker:
+    'disk' (guardado vigente, o sin red: refresh=False / OFFLINE),
+    'network' (refrescado ahora) o 'failed' (tocaba refrescar y falló:
+    lo devuelto es lo viejo del disco, o nada).
+    columns limita las columnas que se leen del disco (ver load_bars).
+    El almacén guarda precios sin ajustar; adjusted=True los devuelve
+    ajustados (ver adjust_ohlc), como los daba yf.download por defecto.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if macro_fixtures.is_replay():
+        out = _replay_bars(tickers, period, interval)
+        if status is not None:
+            status.update({t: "failed" if df.empty else "disk" for t, df in out.items()})
+        return {t: _finish(df, columns, adjusted) for t, df in out.items()}
+
+    init_db()
+    start = period_start(period)
+
+    full, tail = [], {}
+    with get_conn() as conn:
+        for ticker in tickers:
+            meta, last = _stored_info(conn, ticker, interval)
+            need = _needs_refresh(meta, last, start, interval)
+            if need == "full":
+                full.append(ticker)
+            elif need == "tail":
+                tail[ticker] = last
+
+    state = {t: "disk" for t in tickers}
+    if refresh and not OFFLINE:
+        # Fallido hasta que llegue algo de la red
+        state.update({t: "failed" for t in [*full, *tail]})
+        cov = start.timestamp() if start is not None else None
+        if full:
+            try:
+                frames, failed = _fetch(full, interval, period=period)
+                for ticker, df in frames.items():
+                    if not df.empty:
+                        # Con ventanas fallidas no se da el periodo por cubierto (se reintenta)
+                        ok = ticker not in failed
+                        save_bars(ticker, interval, df, covered_from=cov if ok else None, full=ok)
+                        state[ticker] = "network" if ok else "failed"
+            except Exception:
+                pass
+        if tail:
+            # Se repite la última vela guardada: puede haber estado incompleta
+            since = pd.Timestamp(min(tail.values()), unit="s", tz="UTC")
+            if interval.endswith(("d", "wk", "mo")):
+                since = since.strftime("%Y-%m-%d")
+            try:
+                frames, _ = _fetch(list(tail), interval, start=since)
+                for ticker, df in frames.items():
+                    if not df.empty:
+                        save_bars(ticker, interval, df)
+                        state[ticker] = "network"
+            except Exception:
+                pass
+    if status is not None:
+        status.update(state)
+
+    # Para ajustar hacen falta Close y Adj Close aunque se pida menos
+    read = columns if columns is None or not adjusted else [*columns, "Close", "Adj Close"]
+    out = {
+        ticker: _finish(load_bars(ticker, interval, start, read), columns, adjusted)
+        for ticker in tickers
+    }
+    if macro_fixtures.is_record():
+        for ticker, df in out.items():
+            if not df.empty:
+                macro_fixtures.save_bars(ticker, interval, load_bars(ticker, interval))
+    return out
+
+
+def _replay_bars(tickers: list[str], period: str, interval: str) -> dict[str, pd.DataFrame]:
+    """
+    Modo replay: velas grabadas, recortadas al periodo contado desde la
+    última vela grabada (no desde hoy) para que el resultado sea estable.
+    """
+    failing = macro_fixtures.inject(tickers)
+    out = {}
+    for ticker in tickers:
+        df = pd.DataFrame() if ticker in failing else macro_fixtures.load_bars(ticker, interval)
+        if not df.empty:
+            last = df.index[-1]
+            start = period_start(period, now=last.tz_convert("UTC") if last.tz else last.tz_localize("UTC"))
+            if start is not None:
+                start = pd.Timestamp(start)
+                df = df[df.index >= (start if last.tz else start.tz_localize(None))]
+        out[ticker] = df
+    return out
+
+
+def get_bars(
+    ticker: str, period: str, interval: str, refresh: bool = True,
+    columns: list[str] | None = None, adjusted: bool = False,
+    status: dict[str, str] | None = None,
+) -> pd.DataFrame:
+    """
+    Velas de un ticker con refresco incremental (ver get_bars_many).
+    """
+    return get_bars_many(
+        [ticker], period, interval, refresh=refresh, columns=columns, adjusted=adjusted, status=status,
+    )[ticker]
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import analizador_impulso as impulso
+import checklist_macro_auto as macro
+import macro_backfill
+import macro_fixtures
+import macro_metrics
+
+# =========================
+# Configuración
+# =========================
+BENCH_DIR = Path(__file__).parent / "benchmarks"
+SEED = 42
+
+# Tamaños por defecto (rápido) y con --full (hasta 1e7 velas, varios GB de RAM)
+SIZES = {
+    "bars": (1_000, 10_000, 100_000, 1_000_000),
+    "calls": (1_000, 10_000, 100_000),
+    "events": (100, 1_000, 10_000, 100_000),
+    "kpi_rows": (100, 1_000, 10_000, 100_000),
+}
+SIZES_FULL = {**SIZES, "bars": SIZES["bars"] + (10_000_000,), "calls": SIZES["calls"] + (1_000_000,)}
+
+
+# =========================
+# Datos sintéticos
+# =========================
+def synthetic_closes(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Velas de 5m con retornos ~N(0, 0.1%) y ~5% de velas planas.
+    """
+    ret = rng.normal(0.0, 0.001, n)
+    ret[rng.random(n) < 0.05] = 0.0
+    idx = pd.date_range("2020-01-01 09:30", periods=n, freq="5min", tz="America/New_York")
+    return pd.DataFrame({"Close": 100.0 * np.exp(np.cumsum(ret))}, index=idx)
+
+
+def synthetic_changes(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    return pd.DataFrame({
+        "es": rng.normal(0.0, 1.2, n),
+        "vix": rng.normal(0.0, 4.0, n),
+        "dxy": rng.normal(0.0, 0.4, n),
+        "has_high": rng.random(n) < 0.15,
+    })
+
+
+def synthetic_calendar(n: int, rng: np.random.Generator, start: datetime) -> list[dict]:
+    """
+    Eventos con los formatos que ha usado ForexFactory: ISO-8601 con offset
+    (feed actual), 'MM-DD-YYYY' + '8:30am' y 'All Day' / 'Tentative'.
+    """
+    countries = ["USD", "EUR", "GBP", "JPY", "CAD"]
+    impacts = ["High", "Medium", "Low", "Holiday"]
+    span_min = max(n // 20, 1) * 24 * 60
+    events = []
+    for i, off in enumerate(rng.integers(0, span_min, n)):
+        dt = start + timedelta(minutes=int(off))
+        kind = i % 10
+        if kind < 7:
+            date_s, time_s = dt.strftime("%Y-%m-%dT%H:%M:00-05:00"), ""
+        elif kind < 9:
+            date_s, time_s = dt.strftime("%m-%d-%Y"), dt.strftime("%I:%M%p").lstrip("0").lower()
+        else:
+            date_s, time_s = dt.strftime("%m-%d-%Y"), "All Day" if i % 20 < 10 else "Tentative"
+        events.append({
+            "title": f"Evento {i}",
+            "country": countries[i % len(countries)],
+            "impact": impacts[int(rng.integers(0, len(impacts)))],
+            "date": date_s,
+            "time": time_s,
+        })
+    return events
+
+
+def synthetic_kpis(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    objetivo = rng.integers(0, 100, n).astype(float)
+    objetivo[rng.random(n) < 0.05] = 0.0  # sin objetivo
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "area": rng.choice(["Trading", "Salud", "Finanzas", "Familia"], n),
+        "kpi": [f"kpi {i}" for i in range(n)],
+        "trimestre": rng.choice(["Q1", "Q2", "Q3", "Q4"], n),
+        "valor_actual": rng.integers(0, 120, n).astype(float),
+        "objetivo": objetivo,
+    })
+
+
+def load_function(path: Path, name: str, namespace: dict):
+    """
+    Carga solo la definición de `name` desde un script de Streamlit, sin
+    ejecutar la UI (importar metas_2026_app.py levantaría la página).
+    """
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    node = next(n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == name)
+    code = compile(ast.Module(body=[node], type_ignores=[]), str(path), "exec")
+    exec(code, namespace)
+    return namespace[name]
+
+
+# =========================
+# Medición
+# =========================
+def measure(fn, repeats: int) -> dict:
+    """
+    Tiempo (min / mediana de `repeats` corridas) y pico de memoria con
+    tracemalloc en una corrida aparte (tracemalloc frena la ejecución).
+    """
+    fn()  # calentamiento (imports perezosos, caches de numpy/pandas)
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def _repeats(n: int, big: int) -> int:
+    return 1 if n >= big else 3 if n >= big // 100 else 5
+
+
+# =========================
+# Casos
+# =========================
+def bench_impulso(sizes, rng):
+    for n in sizes:
+        df = synthetic_closes(n, rng)
+        yield "analizar_impulso", n, lambda: impulso.analizar_impulso(df), _repeats(n, 1_000_000)
+
+        yield "analizar_close", n, lambda: impulso.analizar_close(df["Close"]), _repeats(n, 1_000_000)
+        yield "perfil_horario", n, lambda: impulso.perfil_horario(df, "30min"), _repeats(n, 1_000_000)
+
+        closes = df["Close"].to_numpy()
+
+        def lote():
+            impulso.AcumuladorImpulso().actualizar_lote(closes)
+
+        yield "AcumuladorImpulso.actualizar_lote", n, lote, _repeats(n, 1_000_000)
+
+
+def bench_macro_mode(sizes, rng):
+    for n in sizes:
+        chg = synthetic_changes(n, rng)
+        def sig(pct):
+            return macro.Signal(macro.arrow_from_change(pct, macro.DEADBAND_PCT), pct, 100.0 + pct, 100.0)
+
+        rows = [(sig(es), sig(vix), sig(dxy), high) for es, vix, dxy, high in chg.itertuples(index=False, name=None)]
+
+        def escalar():
+            for es, vix, dxy, high in rows:
+                macro.determine_macro_mode(es, vix, dxy, high)
+
+        yield "determine_macro_mode", n, escalar, _repeats(n, 1_000_000)
+
+        # Mismas reglas vectorizadas (cierres armados para reproducir los cambios %)
+        closes = (1.0 + chg[["es", "vix", "dxy"]] / 100.0).cumprod()
+        closes.index = pd.date_range("2000-01-01", periods=n, freq="D")
+        yield "backfill_macro_modes", n, lambda: macro_backfill.backfill_macro_modes(closes), _repeats(n, 1_000_000)
+
+
+def bench_calendar(sizes, rng):
+    start = datetime(2026, 1, 5, 0, 0)
+    macro_fixtures.REPLAY_NOW = (start + timedelta(days=1)).isoformat() + "-05:00"
+
+    for n in sizes:
+        events = synthetic_calendar(n, rng, start)
+        pairs = [(ev["date"], ev["time"]) for ev in events]
+
+        def parse():
+            for date_s, time_s in pairs:
+                macro._parse_ff_datetime(date_s, time_s)
+
+        yield "_parse_ff_datetime", n, parse, _repeats(n, 100_000)
+        yield "build_calendar_index", n, lambda: macro.build_calendar_index(events), _repeats(n, 100_000)
+
+        index = macro.build_calendar_index(events)
+        t0 = macro_fixtures.now(macro.TZ_LOCAL)
+        t1 = t0 + timedelta(hours=macro.LOOKAHEAD_HOURS)
+        yield "CalendarIndex.window", n, lambda: index.window(t0, t1), 10
+
+        # Extremo a extremo sin red: el calendario se sirve como fixture (replay)
+        macro_fixtures.save_ff(events)
+        yield "high_impact_news_ff", n, macro.high_impact_news_ff, _repeats(n, 100_000)
+
+
+def bench_kpis(sizes, rng):
+    calc = load_function(Path(__file__).parent / "metas_2026_app.py", "calc_progress_and_status", {"pd": pd})
+    for n in sizes:
+        df = synthetic_kpis(n, rng)
+        yield "calc_progress_and_status", n, lambda: calc(df), _repeats(n, 100_000)
+
+
+SUITES = {
+    "impulso": (bench_impulso, "bars"),
+    "macro_mode": (bench_macro_mode, "calls"),
+    "calendar": (bench_calendar, "events"),
+    "kpis": (bench_kpis, "kpi_rows"),
+}
+
+
+# =========================
+# Resultados
+# =========================
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, timeout=10,
+        )
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def run(suites: list[str], full: bool = False, max_n: int | None = None) -> dict:
+    sizes = SIZES_FULL if full else SIZES
+    rng = np.random.default_rng(SEED)
+    results = []
+
+    # Sin red ni efectos colaterales: calendario desde fixtures temporales, métricas apagadas
+    metrics_enabled = macro_metrics.ENABLED
+    macro_metrics.ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp:
+        macro_fixtures.set_mode("replay", Path(tmp))
+        try:
+            for suite in suites:
+                bench, key = SUITES[suite]
+                suite_sizes = [n for n in sizes[key] if max_n is None or n <= max_n]
+                for name, n, fn, repeats in bench(suite_sizes, rng):
+                    res = {"suite": suite, "name": name, "n": n, "repeats": repeats, **measure(fn, repeats)}
+                    results.append(res)
+                    print(
+                        f"{name:<36} n={n:>10,}  min={res['min_s'] * 1000:>10.2f} ms  "
+                        f"med={res['median_s'] * 1000:>10.2f} ms  peak={res['peak_mb']:>9.2f} MB",
+                        flush=True,
+                    )
+        finally:
+            macro_fixtures.set_mode("live")
+            macro_metrics.ENABLED = metrics_enabled
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.2) -> list[dict]:
+    """
+    Cociente actual / base por (función, n). ratio > threshold = regresión.
+    """
+    base = {(r["name"], r["n"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["name"], r["n"]))
+        if not b:
+            continue
+        ratio = r["min_s"] / b["min_s"] if b["min_s"] > 0 else float("nan")
+        rows.append({
+            "name": r["name"],
+            "n": r["n"],
+            "base_ms": b["min_s"] * 1000,
+            "actual_ms": r["min_s"] * 1000,
+            "ratio": ratio,
+            "peak_mb_base": b["peak_mb"],
+            "peak_mb": r["peak_mb"],
+            "regresion": ratio > threshold,
+        })
+    return rows
+
+
+# =========================
+# Main
+# =========================
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks de impulso, modo macro, calendario y KPIs (sin red).")
+    ap.add_argument("suites", nargs="*", help=f"Suites: {', '.join(SUITES)} (todas por defecto)")
+    ap.add_argument("--full", action="store_true", help="Incluye los tamaños grandes (1e7 velas, 1e6 llamadas)")
+    ap.add_argument("--max-n", type=int, help="Omite tamaños mayores a este n")
+    ap.add_argument("-o", "--output", help="JSON de salida (por defecto benchmarks/<commit>.json)")
+    ap.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--threshold", type=float, default=1.2, help="Cociente de tiempo que cuenta como regresión")
+    args = ap.parse_args(argv)
+    unknown = [s for s in args.suites if s not in SUITES]
+    if unknown:
+        ap.error(f"suite desconocida: {', '.join(unknown)} (opciones: {', '.join(SUITES)})")
+
+    result = run(args.suites or list(SUITES), full=args.full, max_n=args.max_n)
+
+    out = Path(args.output) if args.output else BENCH_DIR / f"{result['meta']['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"\nResultados en {out}")
+
+    if args.compare:
+        rows = compare(result, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.threshold)
+        if rows:
+            with pd.option_context("display.width", 160):
+                print()
+                print(pd.DataFrame(rows).round(3).to_string(index=False))
+        if any(r["regresion"] for r in rows):
+            print(f"\nRegresiones (> x{args.threshold}) respecto a {args.compare}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,25 @@ from __future__ import annotations
 
 import json
 import re
-from dataclasses import dataclass
+import threading
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from heapq import merge
 from pathlib import Path
 
 import requests
 import yfinance as yf
+from requests.adapters import HTTPAdapter
 from dateutil import tz
 
+import bar_store
+import macro_fixtures
+from macro_metrics import record, span
+
 # =========================
 # Configuración
 # =========================
@@ -21,10 +32,25 @@ LOOKAHEAD_HOURS = 24                   # Ventana: ahora -> próximas N horas par
 FF_URL_JSON = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
 CACHE_PATH = Path("ff_calendar_cache.json")
 CACHE_TTL_MIN = 15                     # Cache local para evitar rate limit
+CACHE_META_PATH = Path("ff_calendar_cache.meta.json")   # ETag / Last-Modified para revalidar
 
 COUNTRIES = {"USD"}                    # País/moneda objetivo en ForexFactory
 IMPACT_LEVELS = {"High"}               # Solo alto impacto
 
+# Señales macro: nombre -> (ticker principal, fallback)
+MACRO_TICKERS = {
+    "es": ("ES=F", "SPY"),
+    "vix": ("^VIX", "VIXY"),
+    "dxy": ("DX-Y.NYB", "UUP"),
+}
+BATCH_PERIOD = "1mo"                   # Un solo periodo basta para last/prev en la descarga en bloque
+MAX_WORKERS = 6                        # Hilos para tickers que no llegaron en la descarga en bloque
+HEDGE_AFTER_S = 2.0                    # Si el principal no responde en N s, se lanza el fallback en paralelo
+SIGNAL_DEADLINE_S = 10.0               # Tope total por señal; al vencer -> señal neutra
+MACRO_REFRESH_S = 300                  # Cada cuánto recalcula el snapshot el refresher de fondo
+BREAKER_BASE_S = 60                    # Circuito abierto tras el 1er fallo de un ticker (se duplica)
+BREAKER_MAX_S = 30 * 60                # Tope del backoff exponencial
+
 
 # =========================
 # Modelos / Helpers
@@ -37,6 +63,22 @@ class Signal:
     prev: float
 
 
+@dataclass
+class SignalFetch:
+    signal: Signal
+    source: str              # ticker que ganó ("N/A" = neutro)
+    elapsed_s: float         # tiempo hasta tener respuesta válida
+    hedged: bool = False     # True si se llegó a lanzar el fallback
+    errors: list[str] = field(default_factory=list)
+
+
+# Pools compartidos: un principal lento no debe bloquear al que llama
+# (con `with ThreadPoolExecutor` el return esperaría al hilo colgado).
+# Los pares van en su propio pool para no competir con sus propias peticiones.
+_POOL = ThreadPoolExecutor(max_workers=2 * MAX_WORKERS, thread_name_prefix="macro")
+_PAIR_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="macro-pair")
+
+
 def arrow_from_change(change_pct: float, deadband_pct: float) -> str:
     if change_pct > deadband_pct:
         return "⬆️"
@@ -45,29 +87,133 @@ def arrow_from_change(change_pct: float, deadband_pct: float) -> str:
     return "⏸️"
 
 
+def _signal_from_closes(closes, deadband_pct: float) -> Signal | None:
+    """
+    Construye la Signal con los 2 últimos cierres válidos (None si no alcanzan).
+    """
+    closes = closes.dropna()
+    if len(closes) < 2:
+        return None
+    last = float(closes.iloc[-1])
+    prev = float(closes.iloc[-2])
+    if prev == 0.0:
+        return None
+    change_pct = ((last - prev) / prev) * 100.0
+    label = arrow_from_change(change_pct, deadband_pct=deadband_pct)
+    return Signal(label=label, change_pct=change_pct, last=last, prev=prev)
+
+
+# =========================
+# Circuit breaker por ticker
+# =========================
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Recuerda fallos recientes por ticker. Tras N fallos seguidos el circuito
+    queda abierto BREAKER_BASE_S * 2**(N-1) segundos (tope BREAKER_MAX_S):
+    mientras tanto no se llama a Yahoo. Al vencer se deja pasar un intento;
+    si falla otra vez, el bloqueo siguiente es el doble.
+    """
+
+    def __init__(self, base_s: float = BREAKER_BASE_S, max_s: float = BREAKER_MAX_S):
+        self.base_s = base_s
+        self.max_s = max_s
+        self._states: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            st = self._states.get(key)
+            return st is None or time.time() >= st["open_until"]
+
+    def retry_in(self, key: str) -> float:
+        with self._lock:
+            st = self._states.get(key)
+            return max(st["open_until"] - time.time(), 0.0) if st else 0.0
+
+    def record_success(self, key: str):
+        with self._lock:
+            self._states.pop(key, None)
+
+    def record_failure(self, key: str, error: str = ""):
+        with self._lock:
+            st = self._states.setdefault(key, {"failures": 0, "open_until": 0.0, "last_error": ""})
+            st["failures"] += 1
+            st["open_until"] = time.time() + min(self.base_s * 2 ** (st["failures"] - 1), self.max_s)
+            st["last_error"] = error
+
+    def status(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "ticker": key,
+                    "fallos": st["failures"],
+                    "estado": "abierto" if now < st["open_until"] else "semiabierto",
+                    "reintento_en_s": max(st["open_until"] - now, 0.0),
+                    "ultimo_error": st["last_error"],
+                }
+                for key, st in sorted(self._states.items())
+            ]
+
+
+_BREAKER = CircuitBreaker()
+
+
+def circuit_status() -> list[dict]:
+    """
+    Tickers con fallos recientes (para mostrar en el dashboard).
+    """
+    return _BREAKER.status()
+
+
 def get_yahoo_signal(ticker: str, deadband_pct: float) -> Signal:
+    """
+    Igual que _fetch_yahoo_signal pero protegido por el circuit breaker:
+    si el ticker falló hace poco, lanza CircuitOpenError sin tocar la red.
+    """
+    with span("get_yahoo_signal", ticker=ticker) as m:
+        m["circuit_open"] = not _BREAKER.allow(ticker)
+        if m["circuit_open"]:
+            raise CircuitOpenError(
+                f"Circuito abierto para {ticker} (reintento en {_BREAKER.retry_in(ticker):.0f}s)."
+            )
+        try:
+            sig = _fetch_yahoo_signal(ticker, deadband_pct)
+        except Exception as e:
+            _BREAKER.record_failure(ticker, str(e))
+            raise
+        _BREAKER.record_success(ticker)
+        return sig
+
+
+def _fetch_yahoo_signal(ticker: str, deadband_pct: float) -> Signal:
     """
     Robusto:
-    1) intenta history 1d (5d/1mo/3mo) para tener last/prev
+    1) intenta histórico 1d (5d/1mo/3mo) vía bar_store para tener last/prev
     2) si falla, intenta fast_info (último precio) y previous_close
+    Un refresco fallido no vale aunque haya cierres viejos en disco.
     """
-    t = yf.Ticker(ticker)
-
     # Intentos de histórico (a veces 5d falla, pero 1mo/3mo funciona)
     for period in ("5d", "1mo", "3mo"):
         try:
-            hist = t.history(period=period, interval="1d", auto_adjust=False)
-            if hist is not None and not hist.empty and len(hist) >= 2:
-                last = float(hist["Close"].iloc[-1])
-                prev = float(hist["Close"].iloc[-2])
-                change_pct = ((last - prev) / prev) * 100.0
-                label = arrow_from_change(change_pct, deadband_pct=deadband_pct)
-                return Signal(label=label, change_pct=change_pct, last=last, prev=prev)
+            status: dict[str, str] = {}
+            hist = bar_store.get_bars(ticker, period, "1d", status=status)
+            if status.get(ticker) != "failed" and hist is not None and not hist.empty:
+                sig = _signal_from_closes(hist["Close"], deadband_pct)
+                if sig is not None:
+                    return sig
         except Exception:
             pass
 
     # Fallback: fast_info (cuando history viene vacío)
     try:
+        if macro_fixtures.is_replay():
+            raise RuntimeError("fast_info no disponible en replay")
+        t = yf.Ticker(ticker)
         fi = getattr(t, "fast_info", {}) or {}
         last = fi.get("last_price") or fi.get("lastPrice") or fi.get("regular_market_price")
         prev = fi.get("previous_close") or fi.get("previousClose")
@@ -87,29 +233,238 @@ def get_yahoo_signal(ticker: str, deadband_pct: float) -> Signal:
     )
 
 
+def hedged_signal(
+    primary: str,
+    fallback: str | None,
+    deadband_pct: float,
+    hedge_after_s: float = HEDGE_AFTER_S,
+    deadline_s: float = SIGNAL_DEADLINE_S,
+) -> SignalFetch:
+    """
+    Petición "hedged" principal/fallback:
+    - arranca el principal
+    - si no respondió en hedge_after_s (o falló antes) -> arranca también el fallback
+    - gana la primera respuesta válida (a igualdad, el principal)
+    - si nada responde antes de deadline_s -> señal neutra
+    """
+    with span("hedged_signal", primary=primary) as m:
+        res = _hedged_signal(primary, fallback, deadband_pct, hedge_after_s, deadline_s)
+        m.update(source=res.source, hedged=res.hedged, fallback=res.source not in {primary, "N/A"},
+                 neutral=res.source == "N/A")
+        return res
+
+
+def _hedged_signal(primary, fallback, deadband_pct, hedge_after_s, deadline_s) -> SignalFetch:
+    t0 = time.perf_counter()
+    pending = {_POOL.submit(get_yahoo_signal, primary, deadband_pct): primary}
+    hedged = False
+    errors: list[str] = []
+
+    def launch_fallback():
+        nonlocal hedged
+        pending[_POOL.submit(get_yahoo_signal, fallback, deadband_pct)] = fallback
+        hedged = True
+
+    while pending:
+        elapsed = time.perf_counter() - t0
+        remaining = deadline_s - elapsed
+        if remaining <= 0:
+            break
+
+        timeout = remaining
+        if fallback and not hedged:
+            timeout = min(remaining, max(hedge_after_s - elapsed, 0.0))
+
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in sorted(done, key=lambda f: pending[f] != primary):
+            src = pending.pop(fut)
+            try:
+                sig = fut.result()
+            except Exception as e:
+                errors.append(f"{src}: {e}")
+                continue
+            return SignalFetch(sig, src, time.perf_counter() - t0, hedged, errors)
+
+        if fallback and not hedged and (not pending or time.perf_counter() - t0 >= hedge_after_s):
+            launch_fallback()
+
+    if pending:
+        errors.append(f"{primary}: sin respuesta en {deadline_s:.0f}s")
+
+    # Último recurso: neutro
+    neutral = Signal(label="⏸️", change_pct=0.0, last=0.0, prev=0.0)
+    return SignalFetch(neutral, "N/A", time.perf_counter() - t0, hedged, errors)
+
+
 def safe_signal(
     primary: str,
     fallback: str | None,
     deadband_pct: float,
+    hedge_after_s: float = HEDGE_AFTER_S,
 ) -> tuple[Signal, str]:
     """
     Obtiene señal con fallback.
     Devuelve: (Signal, source_used)
-    - Si primary falla -> intenta fallback
+    - Si primary falla o tarda más de hedge_after_s -> intenta fallback en paralelo
     - Si ambos fallan -> retorna señal neutra para no tumbar el script
     """
+    res = hedged_signal(primary, fallback, deadband_pct, hedge_after_s=hedge_after_s)
+    return res.signal, res.source
+
+
+def get_yahoo_signals(
+    tickers: list[str],
+    deadband_pct: float,
+    errors: list[str] | None = None,
+    retry_missing: bool = True,
+    status: dict[str, str] | None = None,
+) -> dict[str, Signal]:
+    """
+    Señales para varios tickers en ~1 round trip:
+    1) una sola descarga en bloque (bar_store: incremental sobre lo ya guardado)
+    2) los que no llegaron (vacíos / NaN / refresco fallido) -> get_yahoo_signal
+       en paralelo (solo si retry_missing)
+
+    Devuelve {ticker: Signal} solo con los tickers que tuvieron datos.
+    Los fallos se anotan en `errors` (si se pasa) en vez de lanzar.
+    `status` (si se pasa) recibe el origen de cada ticker de la descarga en
+    bloque: 'disk' / 'network' / 'failed' (ver bar_store.get_bars_many).
+    """
+    tickers = list(dict.fromkeys(tickers))  # sin duplicados, respetando orden
+    signals: dict[str, Signal] = {}
+    if not tickers:
+        return signals
+
+    # Tickers con circuito abierto: ni se piden
+    blocked = [t for t in tickers if not _BREAKER.allow(t)]
+    if blocked and errors is not None:
+        errors.extend(f"{t}: circuito abierto (reintento en {_BREAKER.retry_in(t):.0f}s)" for t in blocked)
+    tickers = [t for t in tickers if t not in blocked]
+
+    status = {} if status is None else status
     try:
-        return get_yahoo_signal(primary, deadband_pct), primary
-    except Exception:
-        if fallback:
+        with span("yahoo_bulk", n=len(tickers)):
+            bars = bar_store.get_bars_many(tickers, BATCH_PERIOD, "1d", status=status) if tickers else {}
+    except Exception as e:
+        bars = {}
+        if errors is not None:
+            errors.append(f"Descarga en bloque falló: {e}")
+
+    for ticker, hist in bars.items():
+        # Cierres de disco tras un refresco fallido = dato viejo -> cuenta como hueco
+        if status.get(ticker) == "failed":
+            if errors is not None and not hist.empty:
+                errors.append(f"{ticker}: no se pudo refrescar (se descartan los cierres guardados)")
+            continue
+        if "Close" in hist.columns:
+            sig = _signal_from_closes(hist["Close"], deadband_pct)
+            if sig is not None:
+                signals[ticker] = sig
+                _BREAKER.record_success(ticker)
+
+    # Un hueco en la descarga en bloque no cuenta para el breaker: el fallo
+    # lo anota get_yahoo_signal solo si su propio intento (5d/1mo/3mo/fast_info)
+    # también falla. Si no, el reintento individual encontraría el circuito abierto.
+    missing = [t for t in tickers if t not in signals]
+    if missing and retry_missing:
+        futures = {t: _POOL.submit(get_yahoo_signal, t, deadband_pct) for t in missing}
+        for ticker, fut in futures.items():
             try:
-                return get_yahoo_signal(fallback, deadband_pct), fallback
-            except Exception:
-                pass
+                signals[ticker] = fut.result(timeout=SIGNAL_DEADLINE_S)
+            except Exception as e:
+                if errors is not None:
+                    errors.append(f"{ticker}: {e}")
 
-    # Último recurso: neutro
-    neutral = Signal(label="⏸️", change_pct=0.0, last=0.0, prev=0.0)
-    return neutral, "N/A"
+    return signals
+
+
+def safe_signals(
+    pairs: dict[str, tuple[str, str | None]],
+    deadband_pct: float,
+    errors: list[str] | None = None,
+    hedge_after_s: float = HEDGE_AFTER_S,
+    deadline_s: float = SIGNAL_DEADLINE_S,
+) -> dict[str, SignalFetch]:
+    """
+    Versión en bloque de safe_signal:
+    1) baja principales y fallbacks a la vez (1 round trip)
+    2) cada par se resuelve principal -> fallback sin más red
+    3) los pares sin ninguno de los dos -> hedged_signal en paralelo
+    deadline_s es un solo tope para todo: la descarga en bloque lo consume
+    y los hedged solo tienen lo que quede.
+
+    pairs: {nombre: (principal, fallback)}, p.ej. MACRO_TICKERS
+    Devuelve: {nombre: SignalFetch} (fuente ganadora + tiempo)
+    Cada señal deja un registro "signal_<nombre>" en las métricas.
+    """
+    t0 = time.perf_counter()
+    tickers = [t for pair in pairs.values() for t in pair if t]
+    # En el pool: un Yahoo colgado no debe pasar del tope (el hilo sigue solo)
+    status: dict[str, str] = {}
+    bulk_errors: list[str] = []
+    bulk = _POOL.submit(
+        get_yahoo_signals, tickers, deadband_pct, errors=bulk_errors, retry_missing=False, status=status
+    )
+    try:
+        signals = bulk.result(timeout=deadline_s)
+        if errors is not None:
+            errors.extend(bulk_errors)
+    except Exception:
+        signals, status = {}, {}
+        if errors is not None:
+            errors.append(f"Descarga en bloque sin respuesta en {deadline_s:.0f}s")
+    bulk_s = time.perf_counter() - t0
+    remaining_s = max(deadline_s - bulk_s, 0.0)
+
+    out: dict[str, SignalFetch] = {}
+    hedges = {}
+    for name, (primary, fallback) in pairs.items():
+        if primary in signals:
+            out[name] = SignalFetch(signals[primary], primary, bulk_s)
+            continue
+
+        if errors is not None:
+            errors.append(f"{name} sin datos con {primary}" + (f" → fallback {fallback}" if fallback else ""))
+        if fallback and fallback in signals:
+            out[name] = SignalFetch(signals[fallback], fallback, bulk_s)
+        else:
+            hedges[name] = _PAIR_POOL.submit(
+                hedged_signal, primary, fallback, deadband_pct,
+                hedge_after_s=hedge_after_s, deadline_s=remaining_s,
+            )
+
+    for name, fut in hedges.items():
+        res = fut.result()
+        res.elapsed_s += bulk_s
+        if errors is not None:
+            errors.extend(res.errors)
+        out[name] = res
+
+    for name, (primary, _) in pairs.items():
+        # Solo lo resuelto con la descarga en bloque puede venir del disco
+        cache_hit = name not in hedges and status.get(out[name].source) == "disk"
+        _record_signal(name, primary, out[name], cache_hit)
+    return {name: out[name] for name in pairs}
+
+
+def _record_signal(name: str, primary: str, res: SignalFetch, cache_hit: bool):
+    """
+    Métrica por señal: fuente ganadora y flags fallback / neutral / hedged;
+    cache_hit = servida desde bar_store sin ir a la red (solo en modo live).
+    """
+    rec = {
+        "name": f"signal_{name}",
+        "source": res.source,
+        "fallback": res.source not in {primary, "N/A"},
+        "neutral": res.source == "N/A",
+        "hedged": res.hedged,
+        "ok": True,
+        "ms": round(res.elapsed_s * 1000.0, 2),
+        "ts": time.time(),
+    }
+    if macro_fixtures.MODE == "live":
+        rec["cache_hit"] = cache_hit
+    record(rec)
 
 
 # =========================
@@ -122,19 +477,82 @@ def _cache_is_fresh(path: Path, ttl_min: int) -> bool:
     return age <= timedelta(minutes=ttl_min)
 
 
+# Sesión HTTP compartida por el proceso: keep-alive + pool de conexiones
+_HTTP: requests.Session | None = None
+_HTTP_LOCK = threading.Lock()
+
+
+def _http_session() -> requests.Session:
+    global _HTTP
+    with _HTTP_LOCK:
+        if _HTTP is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+            session.headers.update({"Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+            _HTTP = session
+        return _HTTP
+
+
+def _read_cache_meta() -> dict:
+    try:
+        return json.loads(CACHE_META_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
 def fetch_ff_calendar_json() -> list[dict]:
     """
     Descarga el calendario semanal de ForexFactory (JSON) y usa cache local.
+    Al vencer el cache se revalida con ETag / Last-Modified:
+    - 304 -> el contenido no cambió, solo se renueva la fecha del cache
+    - 200 -> se guarda el JSON nuevo y sus validadores
     """
-    if _cache_is_fresh(CACHE_PATH, CACHE_TTL_MIN):
-        return json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    with span("fetch_ff_calendar_json") as m:
+        if macro_fixtures.is_replay():
+            m["replay"] = True
+            return macro_fixtures.load_ff()
+
+        m["cache_hit"] = _cache_is_fresh(CACHE_PATH, CACHE_TTL_MIN)
+        if m["cache_hit"]:
+            data = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        else:
+            data, m["not_modified"] = _download_ff_calendar()
+
+        if macro_fixtures.is_record():
+            macro_fixtures.save_ff(data)
+        return data
+
+
+def _download_ff_calendar() -> tuple[list[dict], bool]:
+    """
+    GET condicional del calendario. Devuelve (data, fue_304).
+    """
+    headers = {}
+    if CACHE_PATH.exists():
+        meta = _read_cache_meta()
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = _http_session().get(FF_URL_JSON, headers=headers, timeout=20)
+    if r.status_code == 304 and CACHE_PATH.exists():
+        CACHE_PATH.touch()
+        return json.loads(CACHE_PATH.read_text(encoding="utf-8")), True
 
-    r = requests.get(FF_URL_JSON, timeout=20)
     r.raise_for_status()
     data = r.json()
 
     CACHE_PATH.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
-    return data
+    CACHE_META_PATH.write_text(
+        json.dumps({"etag": r.headers.get("ETag", ""), "last_modified": r.headers.get("Last-Modified", "")}),
+        encoding="utf-8",
+    )
+    return data, False
+
+
+_FF_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})(am|pm)$")
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
 
 
 def _parse_ff_datetime(date_str: str, time_str: str) -> datetime | None:
@@ -142,20 +560,37 @@ def _parse_ff_datetime(date_str: str, time_str: str) -> datetime | None:
     ForexFactory suele dar:
       date: 'MM-DD-YYYY'
       time: '8:30am', 'All Day', 'Tentative'
+    El feed JSON actual da en cambio ISO-8601 con offset en `date`
+    ('2026-02-15T04:30:00-05:00') y no trae `time`.
+    Siempre devuelve la hora en TZ_LOCAL.
     """
     if not date_str:
         return None
+    date_str = date_str.strip()
+
+    # ISO-8601 (con o sin hora / offset)
+    if _ISO_DATE_RE.match(date_str):
+        try:
+            d = datetime.fromisoformat(date_str)
+        except ValueError:
+            return None
+        if "T" not in date_str and " " not in date_str:
+            # Solo fecha: se completa con time_str como en el formato clásico
+            return _parse_ff_datetime(d.strftime("%m-%d-%Y"), time_str)
+        if d.tzinfo is None:
+            return d.replace(tzinfo=TZ_LOCAL)
+        return d.astimezone(TZ_LOCAL)
 
     # "All Day" / "Tentative" -> asignamos mediodía para comparaciones
     if not time_str or time_str.strip().lower() in {"all day", "tentative"}:
         try:
-            d = datetime.strptime(date_str.strip(), "%m-%d-%Y")
+            d = datetime.strptime(date_str, "%m-%d-%Y")
             return d.replace(hour=12, minute=0, tzinfo=TZ_LOCAL)
         except Exception:
             return None
 
     t = time_str.strip().lower().replace(" ", "")
-    m = re.match(r"^(\d{1,2}):(\d{2})(am|pm)$", t)
+    m = _FF_TIME_RE.match(t)
     if not m:
         return None
 
@@ -169,60 +604,140 @@ def _parse_ff_datetime(date_str: str, time_str: str) -> datetime | None:
         hh = 0
 
     try:
-        d = datetime.strptime(date_str.strip(), "%m-%d-%Y")
+        d = datetime.strptime(date_str, "%m-%d-%Y")
         return datetime(d.year, d.month, d.day, hh, mm, tzinfo=TZ_LOCAL)
     except Exception:
         return None
 
 
-def high_impact_news_ff(lookahead_hours: int = LOOKAHEAD_HOURS) -> tuple[bool, list[dict]]:
+@dataclass
+class CalendarIndex:
     """
-    Detecta eventos USD + High dentro de la ventana:
-      ahora -> próximas lookahead_hours horas
-
-    Retorna:
-      (hay_alto_impacto, eventos)
+    Calendario parseado una sola vez, particionado por (país, impacto).
+    Cada partición: (timestamps ordenados, eventos en el mismo orden).
     """
-    data = fetch_ff_calendar_json()
-
-    now = datetime.now(TZ_LOCAL)
-    end = now + timedelta(hours=lookahead_hours)
-
-    relevant: list[dict] = []
+    partitions: dict[tuple[str, str], tuple[list[float], list[dict]]]
+
+    def window(
+        self,
+        start: datetime,
+        end: datetime,
+        countries: set[str] = COUNTRIES,
+        impacts: set[str] = IMPACT_LEVELS,
+    ) -> list[dict]:
+        """
+        Eventos con start <= hora <= end (búsqueda binaria por partición),
+        en orden cronológico.
+        """
+        t0, t1 = start.timestamp(), end.timestamp()
+        slices = []
+        for country in countries:
+            for impact in impacts:
+                part = self.partitions.get((country, impact))
+                if not part:
+                    continue
+                times, events = part
+                lo, hi = bisect_left(times, t0), bisect_right(times, t1)
+                slices.append(zip(times[lo:hi], events[lo:hi]))
+        return [ev for _, ev in merge(*slices, key=lambda p: p[0])]
+
+
+def build_calendar_index(data) -> CalendarIndex:
+    buckets: dict[tuple[str, str], list[tuple[float, dict]]] = {}
     for ev in data if isinstance(data, list) else []:
         country = str(ev.get("country", "")).strip()
         impact = str(ev.get("impact", "")).strip()
-        title = str(ev.get("title", "")).strip()
         date_s = str(ev.get("date", "")).strip()
         time_s = str(ev.get("time", "")).strip()
 
-        if country not in COUNTRIES:
-            continue
-        if impact not in IMPACT_LEVELS:
-            continue
-
         ev_dt = _parse_ff_datetime(date_s, time_s)
         if ev_dt is None:
             continue
 
-        if now <= ev_dt <= end:
-            relevant.append(
+        buckets.setdefault((country, impact), []).append(
+            (
+                ev_dt.timestamp(),
                 {
-                    "title": title,
+                    "title": str(ev.get("title", "")).strip(),
                     "country": country,
                     "impact": impact,
                     "date": date_s,
                     "time": time_s,
                     "local_dt": ev_dt.isoformat(),
-                }
+                },
             )
+        )
+
+    partitions = {}
+    for key, items in buckets.items():
+        items.sort(key=lambda p: p[0])
+        partitions[key] = ([t for t, _ in items], [ev for _, ev in items])
+    return CalendarIndex(partitions)
+
+
+# Índice en memoria, reconstruido solo si cambia el contenido del cache
+_INDEX: dict = {"key": None, "index": None}
+_INDEX_LOCK = threading.Lock()
+
+
+def load_calendar_index() -> CalendarIndex:
+    """
+    Índice del calendario vigente. Descarga/revalida vía fetch_ff_calendar_json
+    cuando el cache venció; el parseo ocurre una vez por contenido nuevo.
+    """
+    # record/replay pasan siempre por fetch_ff_calendar_json (graba / sirve el fixture)
+    if macro_fixtures.MODE != "live" or not _cache_is_fresh(CACHE_PATH, CACHE_TTL_MIN):
+        data = fetch_ff_calendar_json()
+        if macro_fixtures.is_replay() or not CACHE_PATH.exists():
+            return build_calendar_index(data)
 
-    return (len(relevant) > 0, relevant)
+    raw = CACHE_PATH.read_bytes()
+    key = (len(raw), zlib.crc32(raw))
+    with _INDEX_LOCK:
+        if _INDEX["key"] != key:
+            _INDEX["index"] = build_calendar_index(json.loads(raw))
+            _INDEX["key"] = key
+        return _INDEX["index"]
+
+
+def high_impact_news_ff(lookahead_hours: int = LOOKAHEAD_HOURS) -> tuple[bool, list[dict]]:
+    """
+    Detecta eventos USD + High dentro de la ventana:
+      ahora -> próximas lookahead_hours horas
+
+    Retorna:
+      (hay_alto_impacto, eventos)
+    """
+    with span("high_impact_news_ff") as m:
+        # El cache vigente se sirve sin pasar por fetch_ff_calendar_json:
+        # el hit/miss se anota aquí para que el diagnóstico lo vea
+        if macro_fixtures.MODE == "live":
+            m["cache_hit"] = _cache_is_fresh(CACHE_PATH, CACHE_TTL_MIN)
+        index = load_calendar_index()
+
+        now = macro_fixtures.now(TZ_LOCAL)
+        end = now + timedelta(hours=lookahead_hours)
+
+        relevant = index.window(now, end, COUNTRIES, IMPACT_LEVELS)
+        m["has_high"] = len(relevant) > 0
+        return (len(relevant) > 0, relevant)
 
 
 # =========================
 # Modo Macro (Risk-On / Neutral / Risk-Off)
 # =========================
+# Umbrales y reglas (compartidos con el backfill vectorizado de macro_backfill.py)
+VIX_EXPANSION_PCT = 1.5                # VIX >= +1.5% -> expansión clara
+ES_SELLOFF_PCT = -1.8                  # ES <= -1.8% -> sell-off reciente
+
+RULE_HIGH_IMPACT = ("🟡 Neutral", "Evento macro cercano → SOLO setups A+.")
+RULE_VIX_EXPANSION = ("🟡 Neutral", "VIX en expansión → mercado inestable → SOLO A+.")
+RULE_SELLOFF = ("🟡 Neutral", "Sell-off reciente → día de transición → SOLO A+.")
+RULE_MIXED = ("🟡 Neutral", "Índices débiles + dólar flojo → Neutral.")
+RULE_RISK_ON = ("🟢 Risk-On", "Flujos pro-riesgo alineados.")
+RULE_DEFAULT = ("🟡 Neutral", "Condiciones no claras → proteger capital.")
+
+
 def determine_macro_mode(es, vix, dxy, has_high):
     """
     Lógica macro anti-sabotaje (versión balanceada)
@@ -230,37 +745,106 @@ def determine_macro_mode(es, vix, dxy, has_high):
 
     # 🚨 1. High impact news = Neutral
     if has_high:
-        return "🟡 Neutral", "Evento macro cercano → SOLO setups A+."
+        return RULE_HIGH_IMPACT
 
     # 🚨 2. VIX en expansión clara
-    if vix.change_pct >= 1.5:
-        return "🟡 Neutral", "VIX en expansión → mercado inestable → SOLO A+."
+    if vix.change_pct >= VIX_EXPANSION_PCT:
+        return RULE_VIX_EXPANSION
 
     # 🚨 3. Daño estructural reciente (sell-off previo)
-    if es.change_pct <= -1.8:
-        return "🟡 Neutral", "Sell-off reciente → día de transición → SOLO A+."
+    if es.change_pct <= ES_SELLOFF_PCT:
+        return RULE_SELLOFF
 
     # ⚠️ 4. Señales mixtas
     if es.change_pct < 0 and dxy.change_pct <= 0:
-        return "🟡 Neutral", "Índices débiles + dólar flojo → Neutral."
+        return RULE_MIXED
 
     # ✅ 5. Risk-On limpio
     if es.change_pct > 0 and vix.change_pct <= 0 and dxy.change_pct <= 0:
-        return "🟢 Risk-On", "Flujos pro-riesgo alineados."
+        return RULE_RISK_ON
 
     # Default seguro
-    return "🟡 Neutral", "Condiciones no claras → proteger capital."
+    return RULE_DEFAULT
+
 
 
+# =========================
+# Refresher de fondo (stale-while-revalidate)
+# =========================
+class MacroRefresher:
+    """
+    Recalcula un snapshot en un hilo de fondo (uno por proceso) y sirve
+    siempre el último valor bueno al instante.
+    - Solo la primera lectura (sin valor aún) espera al cálculo.
+    - Si un recálculo falla, se conserva el valor anterior.
+    """
+
+    def __init__(self, compute, interval_s: float = MACRO_REFRESH_S):
+        self._compute = compute
+        self.interval_s = interval_s
+        self._value = None
+        self._updated_at: float | None = None
+        self.last_error: str | None = None
+        self._compute_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "MacroRefresher":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="macro-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            self._wake.wait(timeout=self.interval_s)
+            self._wake.clear()
+            self.refresh_now()
+
+    def refresh_now(self) -> bool:
+        """
+        Recalcula ya (bloqueante). Si otro hilo ya está calculando, espera
+        a ese resultado en vez de lanzar un segundo cálculo.
+        """
+        requested_at = time.time()
+        with self._compute_lock:
+            if self._updated_at is not None and self._updated_at >= requested_at:
+                return True
+            try:
+                value = self._compute()
+            except Exception as e:
+                self.last_error = str(e)
+                return False
+            self._value = value
+            self._updated_at = time.time()
+            self.last_error = None
+            return True
+
+    def get(self):
+        """
+        Devuelve (snapshot, edad_en_segundos). No toca la red salvo la
+        primera vez en el proceso.
+        """
+        if self._value is None:
+            self.refresh_now()
+        return self._value, self.age_s()
+
+    def age_s(self) -> float | None:
+        if self._updated_at is None:
+            return None
+        return time.time() - self._updated_at
+
 
 # =========================
 # Main
 # =========================
 def main():
     # Señales con fallback (para que NUNCA se caiga si Yahoo falla)
-    es, es_src = safe_signal("ES=F", "SPY", DEADBAND_PCT)           # fallback: SPY
-    vix, vix_src = safe_signal("^VIX", "VIXY", DEADBAND_PCT)        # fallback: VIXY
-    dxy, dxy_src = safe_signal("DX-Y.NYB", "UUP", DEADBAND_PCT)     # fallback: UUP
+    # Principales + fallbacks (SPY, VIXY, UUP) en una sola descarga
+    sigs = safe_signals(MACRO_TICKERS, DEADBAND_PCT)
+    es, es_src = sigs["es"].signal, sigs["es"].source
+    vix, vix_src = sigs["vix"].signal, sigs["vix"].source
+    dxy, dxy_src = sigs["dxy"].signal, sigs["dxy"].source
 
     # Noticias alto impacto (auto) con protección
     try:
@@ -0,0 +1,819 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # El snapshot Parquet es opcional
+    pa = pq = None
+
+# =========================
+# Configuración
+# =========================
+CSV_FILE = "diario_trading.csv"
+ENCODING = "utf-8"
+CHUNK = 64 * 1024
+
+# Dónde vive el diario: "sqlite" (diario_trading.db junto al CSV, con índices)
+# o "csv" (append sobre diario_trading.csv). La primera vez que se abre la
+# base se migra el CSV existente; el CSV queda como estaba (respaldo).
+BACKEND = os.environ.get("DIARIO_BACKEND", "sqlite").strip().lower()
+
+# Tipos de columna en SQLite (lo que no está aquí es TEXT)
+COLUMNAS_REAL = {
+    "entrada", "stop", "target",
+    "slv_objetivo", "slv_stop",
+    "capital_total", "max_riesgo_trade", "max_monto_trade",
+    "fondo_inversion", "limite_riesgo_diario", "limite_riesgo_trade",
+    "contratos", "prima_entrada", "prima_stop",
+    "costo_entrada_usd", "riesgo_usd", "position_size",
+}
+PREFIJOS_BOOL = ("checklist_", "check_")
+COLUMNAS_BOOL = {"acepto_perder_financiero"}
+
+# Snapshot Parquet tipado (<csv>.parquet/): categóricas y compactación
+COLUMNAS_CATEGORIA = {"activo", "direccion", "estado_emocional", "tipo_trade",
+                      "setup_clasificacion", "macro_mode"}
+PARTES_MAX = 32  # Partes incrementales antes de compactar en una sola
+
+# Filtros frecuentes (Últimos Trades, rangos de fecha, estadísticas por setup)
+INDICES = ["fecha", "activo", "setup_clasificacion", "macro_mode"]
+
+# CSV: escritura solo por append: guardar un trade cuesta lo mismo con 10 o con
+# 100.000 filas y un corte a mitad de escritura solo puede afectar a la fila
+# nueva. Si aparecen columnas nuevas no se reescribe el histórico: se agregan
+# al final de cada fila nueva y se anota una versión del encabezado en
+# <csv>.schema.json (leer() usa la última).
+
+
+def schema_path(path) -> Path:
+    return Path(f"{path}.schema.json")
+
+
+# =========================
+# Bloqueo entre procesos
+# =========================
+# Varias pestañas / apps pueden guardar a la vez: toda escritura del CSV,
+# de su schema.json y del snapshot pasa por un lock de archivo
+# (<csv>.lock). SQLite se serializa solo con BEGIN IMMEDIATE.
+#
+# Orden único: primero el lock del CSV, después SQLite. Nunca se pide el
+# lock del CSV con una transacción de SQLite abierta (migrar lee el CSV
+# antes de BEGIN IMMEDIATE). El lock es reentrante por hilo: un camino que
+# ya lo tiene (p. ej. actualizar_snapshot -> migrar) no se bloquea a sí mismo.
+_tomados = threading.local()
+
+
+def lock_path(path) -> Path:
+    return Path(f"{path}.lock")
+
+
+@contextmanager
+def bloqueo(path, compartido: bool = False):
+    """
+    Lock exclusivo (o compartido, para lectores) sobre <csv>.lock.
+    flock/msvcrt: lo suelta el sistema si el proceso muere.
+    """
+    tomados = _tomados.__dict__.setdefault("rutas", {})  # ruta -> compartido
+    clave = str(lock_path(path))
+    if clave in tomados:
+        if tomados[clave] and not compartido:
+            raise RuntimeError(f"{clave}: no se puede pasar de lock compartido a exclusivo")
+        yield  # Este hilo ya lo tiene
+        return
+
+    with open(lock_path(path), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if compartido else fcntl.LOCK_EX)
+        else:
+            # msvcrt no tiene lock compartido; LK_LOCK reintenta ~10 s y luego falla
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        tomados[clave] = compartido
+        try:
+            yield
+        finally:
+            del tomados[clave]
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# =========================
+# Encabezado / versiones
+# =========================
+def _primera_linea(path) -> bytes:
+    # El encabezado nunca tiene campos multilínea: basta con leer hasta el primer \n
+    out = b""
+    with open(path, "rb") as f:
+        while b"\n" not in out:
+            chunk = f.read(CHUNK)
+            if not chunk:
+                break
+            out += chunk
+    return out.split(b"\n", 1)[0] + (b"\n" if b"\n" in out else b"")
+
+
+def leer_encabezado(path) -> tuple[list[str], str]:
+    """
+    (columnas del encabezado físico, fin de línea del archivo: "\\r\\n" o "\\n").
+    """
+    linea = _primera_linea(path)
+    terminador = "\r\n" if linea.endswith(b"\r\n") else "\n"
+    texto = linea.decode(ENCODING).lstrip("\ufeff").rstrip("\r\n")
+    return (next(csv.reader([texto])) if texto else []), terminador
+
+
+def _leer_schema(path) -> dict:
+    sp = schema_path(path)
+    if not sp.exists():
+        return {"versions": []}
+    try:
+        return json.loads(sp.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"versions": []}
+
+
+def columnas(path) -> list[str]:
+    """
+    Columnas vigentes: la última versión registrada o, si no hay, el encabezado.
+    """
+    encabezado, _ = leer_encabezado(path)
+    versiones = _leer_schema(path).get("versions", [])
+    if versiones:
+        ultima = versiones[-1]["columns"]
+        if ultima[: len(encabezado)] == encabezado:
+            return ultima
+    return encabezado
+
+
+def _registrar_version(path, cols: list[str], encabezado: list[str], desde_byte: int):
+    """
+    Anota una versión nueva del encabezado. desde_byte = tamaño del CSV
+    cuando empezó a regir (las filas anteriores tienen menos campos).
+    """
+    schema = _leer_schema(path)
+    versiones = schema.setdefault("versions", [])
+    if not versiones:
+        versiones.append({"version": 1, "columns": encabezado, "desde_byte": 0, "fecha": None})
+    versiones.append({
+        "version": versiones[-1]["version"] + 1,
+        "columns": cols,
+        "desde_byte": desde_byte,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    sp = schema_path(path)
+    tmp = sp.with_name(sp.name + ".tmp")
+    tmp.write_text(json.dumps(schema, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, sp)
+
+
+# =========================
+# Validación
+# =========================
+def _valor(col: str, v) -> str:
+    # Mismo texto que escribía pandas.to_csv (vacío para nulos, True/False, repr de float)
+    if v is None or v is pd.NA or v is pd.NaT:
+        return ""
+    if isinstance(v, float) and math.isnan(v):
+        return ""
+    if isinstance(v, (list, tuple, set, dict)):
+        raise ValueError(f"Columna '{col}': se esperaba un valor simple, llegó {type(v).__name__}")
+    return str(v)
+
+
+def validar_fila(fila: dict, columns: list[str]) -> None:
+    """
+    Revisa la fila contra COLUMNS: una clave fuera de `columns` (p. ej. un
+    typo) es ValueError, no una columna nueva permanente en el diario.
+    """
+    for key in fila:
+        if not isinstance(key, str) or not key.strip():
+            raise ValueError(f"Nombre de columna inválido: {key!r}")
+    permitidas = set(columns)
+    fuera = [key for key in fila if key not in permitidas]
+    if fuera:
+        raise ValueError(f"Columnas que no están en COLUMNS: {', '.join(fuera)}")
+
+
+# =========================
+# Escritura (append)
+# =========================
+def _linea(valores: list[str], terminador: str) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator=terminador).writerow(valores)
+    return buf.getvalue().encode(ENCODING)
+
+
+def _termina_en_salto(f) -> bool:
+    f.seek(0, os.SEEK_END)
+    if f.tell() == 0:
+        return True
+    f.seek(-1, os.SEEK_END)
+    return f.read(1) == b"\n"
+
+
+def agregar_csv(path, fila: dict, columns: list[str]) -> None:
+    """
+    Agrega una fila al diario sin leer ni reescribir el archivo:
+    - valida la fila contra `columns` (el COLUMNS de la app)
+    - columnas nuevas en `columns` -> versión nueva del encabezado (no se toca el histórico)
+    - una sola escritura + fsync, con el lock del diario tomado
+    """
+    validar_fila(fila, list(columns))
+    with bloqueo(path):
+        _agregar_csv(Path(path), fila, columns)
+
+
+def _agregar_csv(path: Path, fila: dict, columns: list[str]) -> None:
+    if not path.exists() or path.stat().st_size == 0:
+        cols = list(dict.fromkeys(columns))
+        terminador = os.linesep  # lo mismo que usaba pandas.to_csv al crear el archivo
+        data = _linea(cols, terminador) + _linea([_valor(c, fila.get(c)) for c in cols], terminador)
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return
+
+    encabezado, terminador = leer_encabezado(path)
+    cols = columnas(path)
+    faltan = list(dict.fromkeys(c for c in columns if c not in cols))
+    if faltan:
+        cols = cols + faltan
+        _registrar_version(path, cols, encabezado, path.stat().st_size)
+
+    data = _linea([_valor(c, fila.get(c)) for c in cols], terminador)
+    with open(path, "a+b") as f:
+        if not _termina_en_salto(f):
+            data = terminador.encode(ENCODING) + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# =========================
+# Lectura
+# =========================
+def leer_csv(path=CSV_FILE) -> pd.DataFrame:
+    """
+    El diario completo con las columnas vigentes. Las filas anteriores a
+    una columna nueva quedan vacías (NaN) en esa columna.
+    """
+    with bloqueo(path, compartido=True):
+        return _leer_csv(path)
+
+
+def _leer_csv(path) -> pd.DataFrame:
+    encabezado, _ = leer_encabezado(path)
+    cols = columnas(path)
+    if cols == encabezado:
+        return pd.read_csv(path)
+    return pd.read_csv(path, header=None, skiprows=1, names=cols)
+
+
+_cache_ultimos: dict = {}  # (ruta, n) -> (bytes, mtime_ns, DataFrame)
+_SEPARADORES = re.compile(b'["\\n]')
+
+
+def _inicio_ultimas(f, fin: int, inicio_datos: int, n: int) -> int:
+    """
+    Offset donde empiezan los últimos n registros, leyendo hacia atrás.
+
+    Un \n separa registros solo si queda fuera de comillas. Como las
+    comillas internas van duplicadas, un punto está fuera de comillas
+    cuando la cantidad de " entre él y el final del archivo es par.
+    """
+    comillas = 0
+    vistos = 0
+    pos = fin
+    while pos > inicio_datos:
+        desde = max(inicio_datos, pos - CHUNK)
+        f.seek(desde)
+        bloque = f.read(pos - desde)
+        for m in reversed(list(_SEPARADORES.finditer(bloque))):
+            j = m.start()
+            if bloque[j] == 0x22:  # "
+                comillas += 1
+            elif comillas % 2 == 0 and desde + j + 1 < fin:
+                vistos += 1
+                if vistos == n:
+                    return desde + j + 1
+        pos = desde
+    return inicio_datos
+
+
+def ultimos_csv(path=CSV_FILE, n: int = 20) -> pd.DataFrame:
+    """
+    Los últimos n registros leyendo solo el final del archivo (respeta campos
+    multilínea entre comillas y \r\n). Cache por (tamaño, mtime).
+    """
+    st_ = os.stat(path)
+    clave = (str(path), n)
+    hit = _cache_ultimos.get(clave)
+    if hit and hit[:2] == (st_.st_size, st_.st_mtime_ns):
+        return hit[2].copy()
+
+    with bloqueo(path, compartido=True):
+        st_ = os.stat(path)  # Dentro del lock: tamaño y contenido coinciden
+        cols = columnas(path)
+        inicio_datos = len(_primera_linea(path))
+        with open(path, "rb") as f:
+            fin = st_.st_size
+            # Saltos finales (incluida la línea vacía que deja un \n extra)
+            while fin > inicio_datos:
+                f.seek(fin - 1)
+                if f.read(1) not in (b"\n", b"\r"):
+                    break
+                fin -= 1
+            inicio = _inicio_ultimas(f, fin, inicio_datos, n) if n > 0 else fin
+            f.seek(inicio)
+            data = f.read(fin - inicio)
+
+    if data.strip():
+        df = pd.read_csv(io.BytesIO(data), header=None, names=cols, encoding=ENCODING)
+    else:
+        df = pd.DataFrame(columns=cols)
+    # Índice 0..n-1: el de leer_csv().tail(n) exigiría contar todo el archivo
+    _cache_ultimos[clave] = (st_.st_size, st_.st_mtime_ns, df)
+    return df.copy()
+
+
+# =========================
+# SQLite
+# =========================
+def db_path(path) -> Path:
+    return Path(path).with_suffix(".db")
+
+
+def tipo_sql(col: str) -> str:
+    if col in COLUMNAS_BOOL or col.startswith(PREFIJOS_BOOL):
+        return "INTEGER"
+    return "REAL" if col in COLUMNAS_REAL else "TEXT"
+
+
+def _q(nombre: str) -> str:
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def _a_sql(col: str, v):
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    if isinstance(v, (list, tuple, set, dict)):
+        raise ValueError(f"Columna '{col}': se esperaba un valor simple, llegó {type(v).__name__}")
+    tipo = tipo_sql(col)
+    if tipo == "INTEGER":
+        if isinstance(v, str):
+            t = v.strip().lower()
+            if t in ("true", "1", "sí", "si", "yes"):
+                return 1
+            if t in ("false", "0", "no"):
+                return 0
+            return None if not t else v
+        return int(bool(v))
+    if tipo == "REAL":
+        if isinstance(v, str) and not v.strip():
+            return None
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            return str(v)  # Se conserva el texto tal cual (SQLite lo admite)
+    if isinstance(v, (datetime, date)):
+        return v.isoformat(sep=" ") if isinstance(v, datetime) else v.isoformat()
+    return str(v)
+
+
+def _columnas_db(conn) -> list[str]:
+    return [r[1] for r in conn.execute("PRAGMA table_info(trades)")][1:]  # sin id
+
+
+def _asegurar_columnas(conn, cols) -> list[str]:
+    actuales = _columnas_db(conn)
+    vistas = set(actuales)
+    for col in cols:
+        if col not in vistas:
+            conn.execute(f"ALTER TABLE trades ADD COLUMN {_q(col)} {tipo_sql(col)}")
+            actuales.append(col)
+            vistas.add(col)
+    for col in INDICES:
+        if col in vistas:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_q('idx_trades_' + col)} ON trades({_q(col)})")
+    return actuales
+
+
+def _insertar(conn, filas: list[dict], cols: list[str]):
+    marcas = ", ".join("?" * len(cols))
+    nombres = ", ".join(_q(c) for c in cols)
+    conn.executemany(
+        f"INSERT INTO trades ({nombres}) VALUES ({marcas})",
+        [[_a_sql(c, fila.get(c)) for c in cols] for fila in filas],
+    )
+
+
+_revisadas: set[str] = set()  # Rutas cuya migración ya se revisó en este proceso
+
+
+@contextmanager
+def _abrir(path, migrar_csv: bool = True):
+    """
+    Conexión a la base del diario (crea tablas; migra el CSV la primera vez).
+    """
+    # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+    conn = sqlite3.connect(db_path(path), timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS trades (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if migrar_csv and str(path) not in _revisadas:
+            migrar(path)  # Si ya estaba migrado es un SELECT en meta
+            _revisadas.add(str(path))
+        yield conn
+    finally:
+        conn.close()
+
+
+def migrar(path=CSV_FILE) -> int:
+    """
+    Copia el CSV a la base (una sola vez; queda anotado en la tabla meta).
+    Devuelve cuántas filas se migraron.
+    """
+    with _abrir(path, migrar_csv=False) as conn:
+        if _migrado(conn) or not Path(path).exists() or os.path.getsize(path) == 0:
+            return 0
+        # El CSV se lee antes de BEGIN IMMEDIATE (orden de locks: CSV -> SQLite)
+        df = leer_csv(path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if _migrado(conn):  # Otro proceso migró mientras se leía el CSV
+                conn.execute("COMMIT")
+                return 0
+            cols = _asegurar_columnas(conn, list(df.columns))
+            filas = df.astype(object).where(df.notna(), None).to_dict("records")
+            _insertar(conn, filas, cols)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('migrado_csv', ?)",
+                (json.dumps({"csv": str(path), "filas": len(filas),
+                             "fecha": time.strftime("%Y-%m-%d %H:%M:%S")}),),
+            )
+            conn.execute("COMMIT")
+            return len(filas)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _migrado(conn) -> bool:
+    return conn.execute("SELECT 1 FROM meta WHERE key = 'migrado_csv'").fetchone() is not None
+
+
+def agregar_db(path, fila: dict, columns: list[str]) -> None:
+    validar_fila(fila, list(columns))
+    with _abrir(path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cols = _asegurar_columnas(conn, list(columns))
+            _insertar(conn, [fila], [c for c in cols if c in fila])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _tipar(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        if tipo_sql(col) == "INTEGER":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("boolean")
+    return df
+
+
+def consultar(
+    path, where: str = "", params=(), limit: int | None = None, columns=None, con_id: bool = False,
+) -> pd.DataFrame:
+    """
+    SELECT sobre trades en orden de guardado. Con limit: las últimas `limit` filas.
+    """
+    with _abrir(path) as conn:
+        disponibles = _columnas_db(conn)
+        cols = [c for c in columns if c in disponibles] if columns else disponibles
+        nombres = ", ".join(["id", *(_q(c) for c in cols)])
+        q = f"SELECT {nombres} FROM trades" + (f" WHERE {where}" if where else "")
+        if limit is not None:
+            q = f"SELECT * FROM ({q} ORDER BY id DESC LIMIT ?) ORDER BY id"
+            params = (*params, int(limit))
+        else:
+            q += " ORDER BY id"
+        df = pd.read_sql_query(q, conn, params=params)
+    return _tipar(df if con_id else df.drop(columns="id"))
+
+
+# =========================
+# Snapshot Parquet
+# =========================
+# Copia columnar y tipada del diario para análisis. Se pone al día fuera
+# del guardado (leer_snapshot() o "python diario.py snapshot"): cada
+# actualización agrega una parte con las filas nuevas (CSV: solo los bytes
+# desde la última vez) y cada PARTES_MAX partes se juntan en una sola sin
+# volver a leer el diario. leer_snapshot() carga solo las columnas pedidas.
+def parquet_dir(path) -> Path:
+    return Path(path).with_suffix(".parquet")
+
+
+def _requiere_pyarrow():
+    if pa is None:
+        raise ValueError("Para el snapshot Parquet instala pyarrow (pip install pyarrow).")
+
+
+def tipo_arrow(col: str):
+    if col == "id":
+        return pa.int64()
+    if col == "fecha":
+        return pa.timestamp("s")  # "2025-12-05", "2025-12-14 16:58"... -> un solo tipo
+    if col in COLUMNAS_CATEGORIA:
+        return pa.dictionary(pa.int32(), pa.string())
+    tipo = tipo_sql(col)
+    if tipo == "INTEGER":
+        return pa.bool_()
+    return pa.float64() if tipo == "REAL" else pa.string()
+
+
+def esquema(cols: list[str]):
+    _requiere_pyarrow()
+    return pa.schema([pa.field(c, tipo_arrow(c)) for c in ["id", *cols]])
+
+
+def _columna_arrow(col: str, serie: pd.Series):
+    tipo = tipo_arrow(col)
+    if col == "id":
+        return pa.array(serie.astype("int64"), type=tipo)
+    if col == "fecha":
+        f = pd.to_datetime(serie.astype("string"), errors="coerce", format="mixed")
+        return pa.array(f.dt.floor("s"), type=tipo, safe=False)
+    valores = [_a_sql(col, v) for v in serie.astype(object)]
+    if pa.types.is_boolean(tipo):
+        return pa.array([bool(v) if isinstance(v, int) else None for v in valores], type=tipo)
+    if pa.types.is_floating(tipo):
+        return pa.array([v if isinstance(v, float) else None for v in valores], type=tipo)
+    texto = pa.array(valores, type=pa.string())
+    return texto.dictionary_encode() if pa.types.is_dictionary(tipo) else texto
+
+
+def tabla_arrow(df: pd.DataFrame, cols: list[str]):
+    """
+    DataFrame del diario (con columna id) -> pyarrow.Table con esquema(cols).
+    """
+    schema = esquema(cols)
+    vacia = pd.Series([None] * len(df), index=df.index, dtype=object)
+    arrays = [_columna_arrow(f.name, df[f.name] if f.name in df.columns else vacia) for f in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _firma(path) -> tuple[list[str], int]:
+    # (columnas vigentes, marca de cambios: último id en SQLite / bytes del CSV)
+    if BACKEND == "csv":
+        return columnas(path), os.path.getsize(path)
+    with _abrir(path) as conn:
+        ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trades").fetchone()[0]
+        return _columnas_db(conn), ultimo
+
+
+def _filas_desde(path, ultimo_id: int, desde_byte: int, cols: list[str]) -> pd.DataFrame:
+    """
+    Filas posteriores a la última actualización del snapshot, con su id.
+    CSV: solo se parsean los bytes desde `desde_byte` (siempre un fin de
+    registro: las escrituras son filas completas bajo el lock).
+    """
+    if BACKEND != "csv":
+        return consultar(path, "id > ?", (ultimo_id,), con_id=True)
+    if desde_byte == 0:
+        df = _leer_csv(path)
+    else:
+        with open(path, "rb") as f:
+            f.seek(desde_byte)
+            data = f.read()
+        df = (pd.read_csv(io.BytesIO(data), header=None, names=cols, encoding=ENCODING)
+              if data.strip() else pd.DataFrame(columns=cols))
+    df.insert(0, "id", range(ultimo_id + 1, ultimo_id + 1 + len(df)))  # id = número de fila
+    return df
+
+
+def _leer_estado(d: Path) -> dict | None:
+    try:
+        return json.loads((d / "_estado.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_json(ruta: Path, data: dict):
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, ruta)
+
+
+def actualizar_snapshot(path=CSV_FILE) -> int:
+    """
+    Lleva el snapshot al día con las filas nuevas. Devuelve cuántas escribió.
+    """
+    _requiere_pyarrow()
+    with bloqueo(path):
+        return _actualizar_snapshot(path)
+
+
+def _actualizar_snapshot(path) -> int:
+    d = parquet_dir(path)
+    estado = _leer_estado(d)
+    cols, marca = _firma(path)
+    if estado and estado["columnas"] == cols and estado["marca"] == marca:
+        return 0
+
+    rehacer = (
+        estado is None
+        or estado["columnas"] != cols
+        or (BACKEND == "csv" and marca < estado["marca"])  # CSV editado a mano
+    )
+    if rehacer:
+        df = _filas_desde(path, 0, 0, cols)
+        ultimo_id = int(df["id"].max()) if len(df) else 0
+        _reemplazar_carpeta(d, [tabla_arrow(df, cols)],
+                            {"columnas": cols, "marca": marca, "ultimo_id": ultimo_id, "partes": 1})
+        return len(df)
+
+    desde_byte = estado["marca"] if BACKEND == "csv" else 0
+    df = _filas_desde(path, estado["ultimo_id"], desde_byte, cols)
+    ultimo_id = int(df["id"].max()) if len(df) else estado["ultimo_id"]
+
+    if len(df) and estado["partes"] + 1 > PARTES_MAX:
+        # Compactación: las partes ya escritas + las filas nuevas en una sola
+        # (Parquet guarda timestamp[s] como ms: se vuelve al esquema explícito)
+        schema = esquema(cols)
+        partes = [pq.read_table(p).cast(schema) for p in sorted(d.glob("part-*.parquet"))]
+        _reemplazar_carpeta(d, [*partes, tabla_arrow(df, cols)],
+                            {"columnas": cols, "marca": marca, "ultimo_id": ultimo_id, "partes": 1})
+        return len(df)
+
+    if len(df):
+        parte = d / f"part-{estado['partes']:05d}.parquet"
+        tmp = parte.with_name(parte.name + ".tmp")
+        pq.write_table(tabla_arrow(df, cols), tmp)
+        os.replace(tmp, parte)
+        estado["partes"] += 1
+    estado.update(marca=marca, ultimo_id=ultimo_id)
+    _escribir_json(d / "_estado.json", estado)
+    return len(df)
+
+
+def _reemplazar_carpeta(d: Path, tablas: list, estado: dict):
+    # Una sola parte con todo; se arma aparte y se cambia de carpeta al final
+    nuevo = d.with_name(d.name + ".tmp")
+    shutil.rmtree(nuevo, ignore_errors=True)
+    nuevo.mkdir(parents=True)
+    pq.write_table(pa.concat_tables(tablas), nuevo / "part-00000.parquet")
+    _escribir_json(nuevo / "_estado.json", estado)
+    viejo = d.with_name(d.name + ".old")
+    shutil.rmtree(viejo, ignore_errors=True)
+    if d.exists():
+        os.replace(d, viejo)
+    os.replace(nuevo, d)
+    shutil.rmtree(viejo, ignore_errors=True)
+
+
+def leer_snapshot(path=CSV_FILE, columns=None) -> pd.DataFrame:
+    """
+    El diario tipado desde Parquet (solo `columns` si se indican).
+    """
+    actualizar_snapshot(path)
+    with bloqueo(path, compartido=True):  # Que no se compacte a mitad de lectura
+        partes = sorted(parquet_dir(path).glob("part-*.parquet"))
+        tabla = pq.read_table(partes, columns=list(columns) if columns else None)
+    df = tabla.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get)
+    return df.drop(columns="id") if "id" in df.columns and not (columns and "id" in columns) else df
+
+
+# =========================
+# API (la usan todas las apps)
+# =========================
+def agregar(path, fila: dict, columns: list[str]) -> None:
+    """
+    Guarda un trade en el backend configurado (BACKEND).
+    """
+    if BACKEND == "csv":
+        agregar_csv(path, fila, columns)
+    else:
+        agregar_db(path, fila, columns)
+
+
+def inicializar(path=CSV_FILE, columns=()) -> None:
+    """
+    Deja el diario listo al arrancar una app. CSV: crea el archivo con
+    encabezado si no existe. SQLite: crea la base (migrando el CSV la
+    primera vez) con las columnas de `columns`; no toca el CSV.
+    """
+    if BACKEND == "csv":
+        with bloqueo(path):
+            if not Path(path).exists() or os.path.getsize(path) == 0:
+                Path(path).write_bytes(_linea(list(columns), os.linesep))
+        return
+    with _abrir(path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _asegurar_columnas(conn, list(columns))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def existe(path=CSV_FILE) -> bool:
+    """
+    ¿Hay diario guardado? (la base o, si no, el CSV que se migrará)
+    """
+    csv_ok = Path(path).exists() and os.path.getsize(path) > 0
+    return csv_ok if BACKEND == "csv" else (db_path(path).exists() or csv_ok)
+
+
+def leer(path=CSV_FILE) -> pd.DataFrame:
+    return leer_csv(path) if BACKEND == "csv" else consultar(path)
+
+
+def ultimos(path=CSV_FILE, n: int = 20) -> pd.DataFrame:
+    """
+    Los últimos n trades (tabla "Últimos Trades").
+    """
+    if BACKEND == "csv":
+        return ultimos_csv(path, n)
+    return consultar(path, limit=n)
+
+
+def rango(path=CSV_FILE, desde=None, hasta=None, **filtros) -> pd.DataFrame:
+    """
+    Trades con fecha en [desde, hasta] (fechas inclusive) y filtros de igualdad,
+    p. ej. rango(CSV_FILE, desde, hasta, activo="SPY", setup_clasificacion="A").
+    """
+    hasta_sig = (pd.Timestamp(hasta).normalize() + timedelta(days=1)) if hasta is not None else None
+    if BACKEND == "csv":
+        df = leer_csv(path)
+        f = pd.to_datetime(df["fecha"], errors="coerce", format="mixed")
+        mask = pd.Series(True, index=df.index)
+        if desde is not None:
+            mask &= f >= pd.Timestamp(desde)
+        if hasta_sig is not None:
+            mask &= f < hasta_sig
+        for col, v in filtros.items():
+            mask &= df[col] == v
+        return df[mask]
+
+    # fecha se guarda como texto ISO ("2025-12-05" / "2025-12-14 16:58"):
+    # el orden de texto coincide con el cronológico y usa el índice
+    where, params = [], []
+    if desde is not None:
+        where.append("fecha >= ?")
+        d = pd.Timestamp(desde)
+        params.append(d.strftime("%Y-%m-%d" if d == d.normalize() else "%Y-%m-%d %H:%M"))
+    if hasta_sig is not None:
+        where.append("fecha < ?")
+        params.append(hasta_sig.strftime("%Y-%m-%d"))
+    for col, v in filtros.items():
+        where.append(f"{_q(col)} = ?")
+        params.append(_a_sql(col, v))
+    return consultar(path, " AND ".join(where), tuple(params))
+
+
+if __name__ == "__main__":
+    import sys
+
+    ruta = sys.argv[2] if len(sys.argv) > 2 else CSV_FILE
+    if len(sys.argv) > 1 and sys.argv[1] == "migrar":
+        print(f"Filas migradas a {db_path(ruta)}: {migrar(ruta)}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "snapshot":
+        print(f"Filas nuevas en {parquet_dir(ruta)}: {actualizar_snapshot(ruta)}")
+    else:
+        print("Uso: python diario.py migrar|snapshot [ruta.csv]")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import diario
+
+# =========================
+# Configuración
+# =========================
+ESCRITORES = 50
+FILAS_POR_ESCRITOR = 20
+BACKENDS = ("csv", "sqlite")
+
+# Texto con todo lo que puede romper una fila: comillas, comas, \n y \r\n
+PLANTILLA_CONTEXTO = 'Escritor {w}, fila {i}: "VWAP, High/Low"\nlínea 2\r\nfin {w}-{i}'
+
+
+def fila(w: int, i: int) -> dict:
+    return {
+        "fecha": time.strftime("%Y-%m-%d %H:%M"),
+        "activo": ("SPY", "SLV", "BTC")[(w + i) % 3],
+        "escritor": w,
+        "seq": i,
+        "contexto_intradia": PLANTILLA_CONTEXTO.format(w=w, i=i),
+        "entrada": 100 + w + i / 100,
+        "checklist_ok": True,
+    }
+
+
+COLUMNS = list(fila(0, 0))
+
+
+# =========================
+# Escritores (un proceso cada uno)
+# =========================
+def escritor(w: int, ruta: str, backend: str, filas: int, salida, arranque):
+    diario.BACKEND = backend
+    arranque.wait()  # Todos empiezan a la vez
+    latencias = []
+    for i in range(filas):
+        t0 = time.perf_counter()
+        diario.agregar(ruta, fila(w, i), COLUMNS)
+        latencias.append(time.perf_counter() - t0)
+    salida.put(latencias)
+
+
+def lector_snapshot(ruta: str, backend: str, arranque, fin):
+    # Pone al día el snapshot Parquet mientras los escritores agregan filas
+    diario.BACKEND = backend
+    arranque.wait()
+    while not fin.is_set():
+        diario.actualizar_snapshot(ruta)
+
+
+def correr(backend: str, escritores: int, filas: int, snapshot: bool, carpeta: Path) -> dict:
+    """
+    snapshot=True: un proceso más actualiza el snapshot Parquet durante la
+    prueba (lectura incremental mientras se escribe) y al final se verifica.
+    """
+    ruta = str(carpeta / f"estres_{backend}.csv")
+    diario.BACKEND = backend
+    diario.agregar(ruta, {c: None for c in COLUMNS}, COLUMNS)  # Crea el diario (fila 0 vacía)
+
+    ctx = mp.get_context("spawn" if sys.platform == "win32" else "fork")
+    salida, arranque, fin = ctx.Queue(), ctx.Event(), ctx.Event()
+    procesos = [
+        ctx.Process(target=escritor, args=(w, ruta, backend, filas, salida, arranque))
+        for w in range(escritores)
+    ]
+    lector = ctx.Process(target=lector_snapshot, args=(ruta, backend, arranque, fin)) if snapshot else None
+    for p in procesos + ([lector] if lector else []):
+        p.start()
+    t0 = time.perf_counter()
+    arranque.set()
+    latencias = [x for _ in procesos for x in salida.get()]
+    for p in procesos:
+        p.join()
+    total_s = time.perf_counter() - t0
+    if lector:
+        fin.set()
+        lector.join()
+
+    errores = verificar(ruta, escritores, filas, snapshot)
+    esperadas = escritores * filas
+    return {
+        "backend": backend,
+        "escritores": escritores,
+        "filas": esperadas,
+        "segundos": round(total_s, 3),
+        "filas_s": round(esperadas / total_s, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p95_ms": round(statistics.quantiles(latencias, n=20)[-1] * 1000, 2),
+        "max_ms": round(max(latencias) * 1000, 2),
+        "errores": errores,
+    }
+
+
+# =========================
+# Verificación
+# =========================
+def verificar(ruta: str, escritores: int, filas: int, snapshot: bool) -> list[str]:
+    """
+    Lista de problemas: filas perdidas, duplicadas o cortadas.
+    """
+    errores = []
+    df = diario.leer(ruta).iloc[1:]  # Sin la fila 0 de creación
+    esperadas = {(w, i) for w in range(escritores) for i in range(filas)}
+
+    claves = list(zip(pd.to_numeric(df["escritor"]).astype(int), pd.to_numeric(df["seq"]).astype(int)))
+    if len(claves) != len(esperadas):
+        errores.append(f"filas: {len(claves)} de {len(esperadas)}")
+    if len(set(claves)) != len(claves):
+        errores.append(f"duplicadas: {len(claves) - len(set(claves))}")
+    perdidas = esperadas - set(claves)
+    if perdidas:
+        errores.append(f"perdidas: {len(perdidas)} (p. ej. {sorted(perdidas)[:3]})")
+
+    cortadas = sum(
+        ctx != PLANTILLA_CONTEXTO.format(w=w, i=i)
+        for (w, i), ctx in zip(claves, df["contexto_intradia"])
+    )
+    if cortadas:
+        errores.append(f"filas cortadas/mezcladas: {cortadas}")
+
+    if snapshot:
+        n = len(diario.leer_snapshot(ruta, ["seq"])) - 1
+        if n != len(esperadas):
+            errores.append(f"snapshot Parquet: {n} de {len(esperadas)} filas")
+    return errores
+
+
+# =========================
+# Main
+# =========================
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Prueba de estrés: escritores en paralelo sobre el diario.")
+    ap.add_argument("backends", nargs="*", help=f"Backends: {', '.join(BACKENDS)} (ambos por defecto)")
+    ap.add_argument("-w", "--escritores", type=int, default=ESCRITORES, help="Procesos escribiendo a la vez")
+    ap.add_argument("-n", "--filas", type=int, default=FILAS_POR_ESCRITOR, help="Filas por escritor")
+    ap.add_argument("--sin-snapshot", action="store_true",
+                    help="Sin el proceso que actualiza el snapshot Parquet durante la prueba")
+    args = ap.parse_args(argv)
+
+    backends = args.backends or list(BACKENDS)
+    desconocidos = [b for b in backends if b not in BACKENDS]
+    if desconocidos:
+        ap.error(f"backend desconocido: {', '.join(desconocidos)}")
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="estres_diario_") as tmp:
+        for backend in backends:
+            snapshot = not args.sin_snapshot and diario.pa is not None
+            r = correr(backend, args.escritores, args.filas, snapshot, Path(tmp))
+            resultados.append(r)
+            estado = "OK" if not r["errores"] else "FALLA: " + "; ".join(r["errores"])
+            print(
+                f"{r['backend']:>6} | {r['escritores']} escritores x {args.filas} filas = {r['filas']} | "
+                f"{r['segundos']:.2f}s | {r['filas_s']:.0f} filas/s | "
+                f"p50 {r['p50_ms']:.1f} ms p95 {r['p95_ms']:.1f} ms máx {r['max_ms']:.0f} ms | {estado}"
+            )
+
+    return 1 if any(r["errores"] for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+import analizador_impulso as impulso
+
+# =========================
+# Configuración
+# =========================
+# Cache compartido entre páginas: la página de impulso y el formulario del
+# plan de trade (app.py) leen las mismas entradas sin volver a descargar.
+CACHE_TTL_S = 300                      # Vida de cada entrada (una vela de 5m)
+CACHE_MAX_ENTRIES = 64                 # (ticker, periodo, intervalo) guardados a la vez
+
+# Símbolo del dashboard -> ticker de Yahoo
+TICKER_YAHOO = {"BTC": "BTC-USD"}
+
+# Periodo por defecto según el intervalo (lo que Yahoo sirve / tiene sentido)
+PERIODO_POR_INTERVALO = {
+    "1m": "5d", "5m": "30d", "15m": "60d", "30m": "60d",
+    "1h": "6mo", "4h": "1y", "1d": "2y",
+}
+
+# Intervalos que Yahoo no da y se arman remuestreando uno más fino
+REMUESTREO = {"4h": "1h"}
+
+
+def ticker_yahoo(simbolo: str) -> str:
+    return TICKER_YAHOO.get(simbolo.strip().upper(), simbolo.strip().upper())
+
+
+def intervalo_yahoo(timeframe: str) -> str:
+    # El plan de trade usa "1D"; Yahoo y bar_store usan "1d"
+    return "1d" if timeframe.strip().upper() == "1D" else timeframe.strip()
+
+
+# =========================
+# Cache (ticker, periodo, intervalo)
+# =========================
+@st.cache_data(ttl=CACHE_TTL_S, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cargar_cierres(ticker: str, period: str, interval: str) -> pd.Series:
+    """
+    Cierres vía bar_store (solo la columna Close). Lanza ValueError si no hay datos.
+    """
+    base = REMUESTREO.get(interval, interval)
+    df = impulso.descargar_datos(ticker_yahoo(ticker), period, base, columnas=["Close"])
+    if base != interval:
+        df = impulso.remuestrear(df, interval)
+    return df["Close"]
+
+
+@st.cache_data(ttl=CACHE_TTL_S, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def analisis(ticker: str, period: str, interval: str) -> dict:
+    """
+    analizar_impulso (con distribución de rachas) sobre los cierres cacheados.
+    """
+    close = cargar_cierres(ticker, period, interval)
+    r = impulso.analizar_close(close, detalle=True)
+    r["desde"], r["hasta"] = close.index[0], close.index[-1]
+    return r
+
+
+@st.cache_data(ttl=CACHE_TTL_S, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def perfil(ticker: str, period: str, interval: str, bloque: str = "30min") -> pd.DataFrame:
+    close = cargar_cierres(ticker, period, interval)
+    return impulso.perfil_horario(close.to_frame(), bloque)
+
+
+def es_intradia(interval: str) -> bool:
+    dur = impulso.duracion_intervalo(interval)
+    return dur is not None and dur < pd.Timedelta(days=1)
+
+
+def limpiar_cache():
+    cargar_cierres.clear()
+    analisis.clear()
+    perfil.clear()
+
+
+# =========================
+# Render
+# =========================
+def render_resumen(r: dict):
+    """
+    Métricas principales de un resultado de analizar_impulso.
+    """
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Alcistas", f"{r['pct_alc']:.1f}%", f"int {r['int_up']:+.3f}%")
+    c2.metric("Bajistas", f"{r['pct_baj']:.1f}%", f"int {r['int_baj']:+.3f}%")
+    c3.metric("Racha UP media", f"{r['racha_up_avg']:.2f}", f"máx {r['racha_up_max']}")
+    c4.metric("Racha DOWN media", f"{r['racha_down_avg']:.2f}", f"máx {r['racha_down_max']}")
+    st.caption(
+        f"{r['velas']} velas ({r['desde']:%Y-%m-%d %H:%M} → {r['hasta']:%Y-%m-%d %H:%M}) | "
+        f"planas {r['pct_plan']:.1f}% | tiempo en impulso UP {r['pct_tiempo_up']:.1f}% / "
+        f"DOWN {r['pct_tiempo_down']:.1f}%"
+    )
+
+
+def render_rachas(r: dict):
+    hist = pd.DataFrame({
+        "UP": pd.Series(r["dist_up"]["hist"]),
+        "DOWN": pd.Series(r["dist_down"]["hist"]),
+    }).fillna(0).sort_index()
+    if not hist.empty:
+        hist.index.name = "largo"
+        st.bar_chart(hist)
+    pct = pd.DataFrame({
+        "UP": r["dist_up"]["percentiles"],
+        "DOWN": r["dist_down"]["percentiles"],
+    })
+    pct.index = [f"p{p}" for p in pct.index]
+    st.dataframe(pct.T.round(1), use_container_width=True)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import checklist_macro_auto as macro
+
+# =========================
+# Configuración
+# =========================
+CACHE_DIR = Path(__file__).parent / "macro_backfill_cache"
+BENCHMARK = "SPY"                      # Activo para medir qué pasó después de cada modo
+HORIZONS = (1, 5, 20)                  # Días hábiles hacia adelante
+CACHE_VERSION = "2"                    # Cambia si cambia el cálculo (invalida el cache)
+
+
+# =========================
+# Datos
+# =========================
+def load_closes(period: str = "5y") -> pd.DataFrame:
+    """
+    Cierres diarios de ES/VIX/DXY, sus fallbacks y SPY en una sola descarga
+    a través de bar_store. Columnas: es, vix, dxy, es_fb, vix_fb, dxy_fb, spy.
+    Los fallbacks van aparte: otro instrumento, otro nivel de precio.
+    """
+    tickers = [t for pair in macro.MACRO_TICKERS.values() for t in pair if t] + [BENCHMARK]
+    bars = bar_store.get_bars_many(tickers, period, "1d")
+
+    def close(ticker):
+        df = bars.get(ticker)
+        return df["Close"] if df is not None and "Close" in df.columns else pd.Series(dtype=float)
+
+    cols = {}
+    for name, (primary, fallback) in macro.MACRO_TICKERS.items():
+        cols[name] = close(primary)
+        if fallback:
+            cols[f"{name}_fb"] = close(fallback)
+    cols["spy"] = close(BENCHMARK)
+    return pd.DataFrame(cols).sort_index()
+
+
+def daily_changes(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cambio % diario de es / vix / dxy. Cada ticker se compara solo consigo
+    mismo; si falta el principal un día se usa el cambio % del fallback
+    (igual que en vivo), nunca su precio: ES≈6000 y SPY≈600 no se mezclan.
+    Días sin cambio de VIX/DXY cuentan como 0%.
+    """
+    def change(col):
+        if col not in closes.columns:
+            return pd.Series(dtype=float)
+        s = closes[col].dropna()
+        return (s.pct_change(fill_method=None) * 100.0).iloc[1:]
+
+    chg = pd.DataFrame(
+        {name: change(name).combine_first(change(f"{name}_fb")) for name in ("es", "vix", "dxy")}
+    ).sort_index()
+    return chg.dropna(subset=["es"]).fillna({"vix": 0.0, "dxy": 0.0})
+
+
+def high_impact_days(data, countries=macro.COUNTRIES, impacts=macro.IMPACT_LEVELS) -> set[date]:
+    """
+    Fechas (hora local) con al menos un evento de alto impacto, a partir de
+    un calendario con el formato de ForexFactory.
+    """
+    index = macro.build_calendar_index(data)
+    days = set()
+    for country in countries:
+        for impact in impacts:
+            times, _ = index.partitions.get((country, impact), ([], []))
+            days.update(pd.to_datetime(times, unit="s", utc=True).tz_convert(macro.TZ_LOCAL).date)
+    return days
+
+
+# =========================
+# Motor vectorizado
+# =========================
+def backfill_macro_modes(closes: pd.DataFrame, high_days: set[date] | None = None) -> pd.DataFrame:
+    """
+    Evalúa determine_macro_mode para todos los días de una vez (np.select con
+    las mismas reglas y en el mismo orden de prioridad).
+
+    closes: columnas es / vix / dxy (cierres diarios) y opcionalmente sus
+    fallbacks es_fb / vix_fb / dxy_fb (ver daily_changes)
+    Devuelve: es_pct, vix_pct, dxy_pct, has_high, macro_mode, macro_rule
+    """
+    chg = daily_changes(closes)
+    es, vix, dxy = (chg[c].to_numpy() for c in ("es", "vix", "dxy"))
+
+    days = pd.DatetimeIndex(chg.index).date
+    has_high = np.isin(days, list(high_days)) if high_days else np.zeros(len(chg), dtype=bool)
+
+    with np.errstate(invalid="ignore"):
+        conds = [
+            has_high,
+            vix >= macro.VIX_EXPANSION_PCT,
+            es <= macro.ES_SELLOFF_PCT,
+            (es < 0) & (dxy <= 0),
+            (es > 0) & (vix <= 0) & (dxy <= 0),
+        ]
+    rules = [
+        macro.RULE_HIGH_IMPACT,
+        macro.RULE_VIX_EXPANSION,
+        macro.RULE_SELLOFF,
+        macro.RULE_MIXED,
+        macro.RULE_RISK_ON,
+    ]
+
+    out = pd.DataFrame(
+        {
+            "es_pct": es,
+            "vix_pct": vix,
+            "dxy_pct": dxy,
+            "has_high": has_high,
+            "macro_mode": np.select(conds, [r[0] for r in rules], default=macro.RULE_DEFAULT[0]),
+            "macro_rule": np.select(conds, [r[1] for r in rules], default=macro.RULE_DEFAULT[1]),
+        },
+        index=chg.index,
+    )
+    return out
+
+
+def forward_returns(close: pd.Series, horizons=HORIZONS) -> pd.DataFrame:
+    """
+    Retorno % desde el cierre del día t hasta t+h (NaN al final de la serie).
+    """
+    return pd.DataFrame(
+        {f"fwd_{h}d": (close.shift(-h) / close - 1.0) * 100.0 for h in horizons},
+        index=close.index,
+    )
+
+
+def mode_stats(modes: pd.DataFrame, spy_close: pd.Series, horizons=HORIZONS, by: str = "macro_mode") -> pd.DataFrame:
+    """
+    Frecuencia de cada modo (o regla) y comportamiento posterior de SPY:
+    media, mediana y % de días positivos por horizonte.
+    """
+    fwd = forward_returns(spy_close, horizons).reindex(modes.index)
+    df = pd.concat([modes[[by]], fwd], axis=1)
+    g = df.groupby(by)
+
+    stats = pd.DataFrame({"dias": g.size()})
+    stats["pct_dias"] = stats["dias"] / stats["dias"].sum() * 100.0
+    for col in fwd.columns:
+        stats[f"{col}_media"] = g[col].mean()
+        stats[f"{col}_mediana"] = g[col].median()
+        stats[f"{col}_pct_pos"] = g[col].apply(lambda s: (s.dropna() > 0).mean() * 100.0)
+    return stats.sort_values("dias", ascending=False)
+
+
+# =========================
+# Cache en disco
+# =========================
+def _cache_key(closes: pd.DataFrame, high_days: set[date] | None) -> str:
+    h = hashlib.sha1()
+    h.update(CACHE_VERSION.encode())
+    h.update(str(closes.index[-1] if len(closes) else "").encode())
+    h.update(str(len(closes)).encode())
+    h.update(json.dumps(sorted(d.isoformat() for d in high_days or ())).encode())
+    return h.hexdigest()[:16]
+
+
+def get_backfill(period: str = "5y", high_days: set[date] | None = None) -> pd.DataFrame:
+    """
+    Serie de modos macro para `period` con cache en disco: se recalcula
+    solo si cambian las velas (nueva sesión) o el conjunto de días con noticias.
+    Incluye el cierre de SPY para medir el comportamiento posterior.
+    """
+    closes = load_closes(period)
+    key = _cache_key(closes, high_days)
+    path = CACHE_DIR / f"modes_{period}_{key}.csv"
+    if path.exists():
+        return pd.read_csv(path, index_col=0, parse_dates=[0])
+
+    modes = backfill_macro_modes(closes, high_days)
+    modes["spy"] = closes["spy"].reindex(modes.index)
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    for old in CACHE_DIR.glob(f"modes_{period}_*.csv"):
+        old.unlink()
+    modes.to_csv(path)
+    return modes
+
+
+# =========================
+# Main
+# =========================
+def main():
+    period = sys.argv[1] if len(sys.argv) > 1 else "5y"
+
+    # El feed de ForexFactory solo trae la semana actual: se usa si está en cache
+    try:
+        high_days = high_impact_days(macro.fetch_ff_calendar_json())
+    except Exception:
+        high_days = set()
+
+    modes = get_backfill(period, high_days)
+    if modes.empty:
+        print("Sin datos para el backfill.")
+        return
+
+    print(f"Backfill macro {modes.index[0]:%Y-%m-%d} → {modes.index[-1]:%Y-%m-%d} ({len(modes)} días)\n")
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(mode_stats(modes, modes["spy"]).round(2))
+        print()
+        print(mode_stats(modes, modes["spy"], by="macro_rule").round(2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Grabación / reproducción de las fuentes macro (Yahoo + ForexFactory).
+#
+# Modos (variable de entorno MACRO_DATA_MODE o set_mode()):
+#   live   -> red normal (por defecto)
+#   record -> red normal y además guarda cada respuesta en MACRO_FIXTURES_DIR
+#   replay -> nunca toca la red: sirve lo grabado por las mismas interfaces
+#             (bar_store.get_bars / fetch_ff_calendar_json)
+#
+# En replay se puede inyectar:
+#   MACRO_REPLAY_LATENCY_S = "0.5"  o  "0.2,ES=F:5,ff:1"   (segundos por fuente)
+#   MACRO_REPLAY_FAIL      = "ES=F,ff"                      (fuentes que fallan)
+#   MACRO_REPLAY_NOW       = "2026-02-18T08:00:00-05:00"    (reloj fijo para el calendario)
+#
+# Uso:
+#   python macro_fixtures.py record   # graba un checklist real
+#   python macro_fixtures.py replay   # lo reproduce sin red
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# =========================
+# Configuración
+# =========================
+MODE = os.getenv("MACRO_DATA_MODE", "live").strip().lower()
+FIXTURES_DIR = Path(os.getenv("MACRO_FIXTURES_DIR", str(Path(__file__).parent / "fixtures")))
+
+
+def _parse_latency(spec: str) -> tuple[float, dict[str, float]]:
+    default, per_source = 0.0, {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if ":" in part:
+            key, val = part.rsplit(":", 1)
+            per_source[key.strip()] = float(val)
+        else:
+            default = float(part)
+    return default, per_source
+
+
+LATENCY_DEFAULT_S, LATENCY_S = _parse_latency(os.getenv("MACRO_REPLAY_LATENCY_S", ""))
+FAIL = {t.strip() for t in os.getenv("MACRO_REPLAY_FAIL", "").split(",") if t.strip()}
+REPLAY_NOW = os.getenv("MACRO_REPLAY_NOW", "").strip()
+
+
+def set_mode(mode: str, fixtures_dir: Path | None = None):
+    global MODE, FIXTURES_DIR
+    if mode not in {"live", "record", "replay"}:
+        raise ValueError(f"Modo no válido: {mode}")
+    MODE = mode
+    if fixtures_dir is not None:
+        FIXTURES_DIR = Path(fixtures_dir)
+
+
+def is_replay() -> bool:
+    return MODE == "replay"
+
+
+def is_record() -> bool:
+    return MODE == "record"
+
+
+def now(tzinfo) -> datetime:
+    """
+    Reloj del calendario: fijo en replay si se definió MACRO_REPLAY_NOW.
+    """
+    if is_replay() and REPLAY_NOW:
+        return datetime.fromisoformat(REPLAY_NOW).astimezone(tzinfo)
+    return datetime.now(tzinfo)
+
+
+def inject(sources: list[str]):
+    """
+    Latencia (la mayor de las fuentes pedidas) y fallos simulados en replay.
+    Devuelve las fuentes que deben fallar.
+    """
+    delay = max([LATENCY_S.get(s, LATENCY_DEFAULT_S) for s in sources] or [0.0])
+    if delay > 0:
+        time.sleep(delay)
+    return {s for s in sources if s in FAIL}
+
+
+# =========================
+# Yahoo (velas)
+# =========================
+def _yahoo_path(ticker: str, interval: str) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", ticker)
+    return FIXTURES_DIR / "yahoo" / f"{safe}_{interval}.json"
+
+
+def save_bars(ticker: str, interval: str, df: pd.DataFrame):
+    idx = pd.DatetimeIndex(df.index)
+    payload = {
+        "ticker": ticker,
+        "interval": interval,
+        "tz": str(idx.tz) if idx.tz is not None else "",
+        "ts": (idx.tz_convert("UTC") if idx.tz is not None else idx).as_unit("s").asi8.tolist(),
+        "columns": {c: [None if pd.isna(v) else float(v) for v in df[c]] for c in df.columns},
+    }
+    path = _yahoo_path(ticker, interval)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload), encoding="utf-8")
+
+
+def load_bars(ticker: str, interval: str) -> pd.DataFrame:
+    path = _yahoo_path(ticker, interval)
+    if not path.exists():
+        return pd.DataFrame()
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    idx = pd.to_datetime(payload["ts"], unit="s", utc=True)
+    idx = idx.tz_convert(payload["tz"]) if payload["tz"] else idx.tz_localize(None)
+    return pd.DataFrame(payload["columns"], index=pd.DatetimeIndex(idx, name="Datetime" if payload["tz"] else "Date"))
+
+
+# =========================
+# ForexFactory
+# =========================
+def _ff_path() -> Path:
+    return FIXTURES_DIR / "ff_calendar.json"
+
+
+def save_ff(data):
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    _ff_path().write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def load_ff():
+    if inject(["ff"]):
+        raise RuntimeError("Falla inyectada (replay): ForexFactory")
+    path = _ff_path()
+    if not path.exists():
+        raise FileNotFoundError(f"No hay fixture del calendario en {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# =========================
+# CLI
+# =========================
+if __name__ == "__main__":
+    # Al correr como script este archivo es __main__: el modo se fija en el
+    # módulo importable, que es el que leen bar_store y checklist_macro_auto.
+    import macro_fixtures
+
+    macro_fixtures.set_mode(sys.argv[1] if len(sys.argv) > 1 else "replay")
+
+    import checklist_macro_auto
+
+    print(f"[macro_fixtures] modo={macro_fixtures.MODE} dir={macro_fixtures.FIXTURES_DIR}")
+    checklist_macro_auto.main()
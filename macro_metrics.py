@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# =========================
+# Configuración
+# =========================
+METRICS_PATH = Path(__file__).parent / "macro_metrics.jsonl"
+MAX_BYTES = 2_000_000                  # Al pasar este tamaño se rota a .1 (se conserva 1 archivo viejo)
+ENABLED = os.getenv("MACRO_METRICS", "1").strip().lower() not in {"0", "false", "no"}
+
+_LOCK = threading.Lock()
+
+
+# =========================
+# Registro
+# =========================
+def record(rec: dict):
+    """
+    Agrega una línea JSON al log de métricas (append, una escritura por registro).
+    """
+    if not ENABLED:
+        return
+    line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+    with _LOCK:
+        try:
+            if METRICS_PATH.exists() and METRICS_PATH.stat().st_size > MAX_BYTES:
+                METRICS_PATH.replace(METRICS_PATH.with_suffix(".jsonl.1"))
+            with open(METRICS_PATH, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass  # Las métricas nunca deben tumbar el dashboard
+
+
+@contextmanager
+def span(name: str, **tags):
+    """
+    Mide la duración de un bloque y la registra:
+
+        with span("ff_fetch") as m:
+            ...
+            m["cache"] = "304"
+
+    El dict que se entrega permite añadir flags (cache hit/miss, fallback...).
+    """
+    rec = {"name": name, **tags}
+    t0 = time.perf_counter()
+    try:
+        yield rec
+        rec.setdefault("ok", True)
+    except Exception as e:
+        rec["ok"] = False
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        rec["ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        rec["ts"] = time.time()
+        record(rec)
+
+
+# =========================
+# Lectura / resumen
+# =========================
+def load_metrics(since_s: float | None = None, path: Path | None = None) -> list[dict]:
+    path = path or METRICS_PATH
+    if not path.exists():
+        return []
+
+    cutoff = time.time() - since_s if since_s is not None else None
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if cutoff is None or rec.get("ts", 0) >= cutoff:
+                out.append(rec)
+    return out
+
+
+def _percentile(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(int(round(q * (len(sorted_vals) - 1))), len(sorted_vals) - 1)
+    return sorted_vals[k]
+
+
+def summarize(records: list[dict]) -> list[dict]:
+    """
+    Por nombre de span: n, p50/p95/max en ms, % de errores y % de cada flag
+    booleano registrado (cache_hit, fallback, hedged...).
+    """
+    groups: dict[str, list[dict]] = {}
+    for rec in records:
+        groups.setdefault(rec.get("name", "?"), []).append(rec)
+
+    rows = []
+    for name, recs in sorted(groups.items()):
+        ms = sorted(float(r.get("ms", 0.0)) for r in recs)
+        row = {
+            "span": name,
+            "n": len(recs),
+            "p50_ms": _percentile(ms, 0.50),
+            "p95_ms": _percentile(ms, 0.95),
+            "max_ms": ms[-1],
+            "error_%": 100.0 * sum(1 for r in recs if not r.get("ok", True)) / len(recs),
+        }
+        flags = {k for r in recs for k, v in r.items() if isinstance(v, bool) and k != "ok"}
+        for flag in sorted(flags):
+            row[f"{flag}_%"] = 100.0 * sum(1 for r in recs if r.get(flag) is True) / len(recs)
+        rows.append(row)
+    return rows
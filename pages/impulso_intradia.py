@@ -0,0 +1,64 @@
+import streamlit as st
+
+import impulso_cache as ic
+
+# =========================
+# CONFIG
+# =========================
+st.set_page_config(page_title="⚡ Analizador de Impulso", layout="wide")
+st.title("⚡ Analizador de Impulso")
+st.caption(
+    f"Velas vía bar_store (solo baja lo nuevo) y resultados en cache por "
+    f"(ticker, periodo, intervalo) durante {ic.CACHE_TTL_S // 60} min."
+)
+
+INTERVALOS = ["1m", "5m", "15m", "30m", "1h", "4h", "1d"]
+
+# =========================
+# SIDEBAR
+# =========================
+with st.sidebar:
+    st.header("Parámetros")
+    tickers_txt = st.text_input("Tickers (separados por coma)", "SPY, SLV, BTC")
+    interval = st.selectbox("Intervalo", INTERVALOS, index=INTERVALOS.index("5m"))
+    period = st.text_input("Periodo", ic.PERIODO_POR_INTERVALO.get(interval, "30d"),
+                           help="1d, 5d, 30d, 60d, 6mo, 1y, 2y, max...")
+    ver_perfil = st.checkbox("Perfil por tramo horario", value=ic.es_intradia(interval),
+                             disabled=not ic.es_intradia(interval))
+    bloque = st.selectbox("Tramo", ["15min", "30min", "1h"], index=1, disabled=not ver_perfil)
+
+    if st.button("🔄 Limpiar cache"):
+        ic.limpiar_cache()
+
+tickers = [t.strip().upper() for t in tickers_txt.split(",") if t.strip()]
+if not tickers:
+    st.info("Escribe al menos un ticker.")
+    st.stop()
+
+# =========================
+# RESULTADOS (uno por ticker, a medida que llegan)
+# =========================
+for ticker in tickers:
+    st.subheader(f"{ticker}  ·  {interval}  ·  {period}")
+    with st.spinner(f"Analizando {ticker}..."):
+        try:
+            r = ic.analisis(ticker, period, interval)
+        except Exception as e:
+            st.error(f"{ticker}: {e}")
+            continue
+
+    ic.render_resumen(r)
+
+    with st.expander("Distribución de rachas"):
+        ic.render_rachas(r)
+
+    if ver_perfil and ic.es_intradia(interval):
+        with st.expander(f"Perfil por tramo ({bloque})"):
+            try:
+                p = ic.perfil(ticker, period, interval, bloque)
+                st.bar_chart(p[["pct_alc", "pct_baj"]])
+                st.dataframe(p.round(3), use_container_width=True)
+            except Exception as e:
+                st.warning(f"Sin perfil: {e}")
+
+    st.divider()